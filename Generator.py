@@ -2,28 +2,35 @@ import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
 import json
 import os
-import glob
-import numpy as np
-import copy
+import queue
+import sys
+import threading
+import time
 
-# --- PATH SETUP ---
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+from hull_engine import (BASE_DIR, MATERIALS, OUTPUT_FILENAME, PRESET_HULLS, EXPORT_STAGES, BlueprintGenerator,
+                         GenerationCancelled, ResultCache, StageMemo, batch_main, build_profile, format_stage_report,
+                         guidmap_signature, parse_sweep_values, run_batch, run_sweep, sweep_cases, sweep_jobs,
+                         write_sweep_table)
 
 # --- CONFIGURATION ---
-DONOR_BLUEPRINT = os.path.join(BASE_DIR, "donor.blueprint")
-GUIDMAP_FILES = ["guidmap.json"]
 SETTINGS_FILE = os.path.join(BASE_DIR, "settings.json")
 
-OUTPUT_FILENAME = "generated_hull.blueprint"
+EXPORT_POLL_MS = 50 # How often the UI drains the export progress queue
+SPECULATE_DELAY_MS = 400 # Quiet time after an edit before the design is built in the background
+REDRAW_FRAME_MS = 16 # Bursts of resize/edit events are redrawn at most once per frame
 
-# --- ROTATION SETTINGS ---
-ROT_BEAM      = 0
-ROT_LEFT_IN   = 19
-ROT_RIGHT_IN  = 17
-ROT_LEFT_OUT  = 18
-ROT_RIGHT_OUT = 16
-ROT_LEFT_STERN  = 19
-ROT_RIGHT_STERN = 17
+MAX_THICKNESS = 50
+
+# Material choice that exports every material from one solve
+ALL_MATERIALS = "All"
+
+# GUI label -> BlueprintGenerator solver name
+SOLVER_CHOICES = {"Greedy": "greedy", "Min-penalty (DP)": "dp"}
+
+# Grid level of detail: 1 m lines only when cells are wider than GRID_MINOR_MIN_PX,
+# and 10 m majors thin out to every 100 m once they are closer than GRID_MAJOR_MIN_PX
+GRID_MINOR_MIN_PX = 3
+GRID_MAJOR_MIN_PX = 4
 
 # --- VISUAL THEME ---
 THEME_BG = "#C4F4FF"
@@ -34,7 +41,6 @@ THEME_HULL_OUTLINE = "#000000"
 THEME_CENTER_LINE = "#FFFFFF"
 THEME_PANEL_BG = "#D4D0C8"
 THEME_TEXT = "#000000"
-
 class HullDesigner:
     def __init__(self, root):
         self.root = root
@@ -49,6 +55,7 @@ class HullDesigner:
         self.var_floor = tk.BooleanVar(value=True)
         self.var_save_path = tk.StringVar(value="")
         self.var_material = tk.StringVar(value="Alloy")
+        self.var_solver = tk.StringVar(value="Greedy")
 
         # Logical Dimensions
         self.var_limit_width = tk.IntVar(value=40)
@@ -60,9 +67,47 @@ class HullDesigner:
         self.offset_y = 20
         self.phys_w = 800
         self.phys_h = 600
+        self.view_half_width = 40 # var_limit_width/var_limit_length as of the last recalc_view(), so
+        self.view_length = 100    # drawing code does not read Tk variables once per point
+
+        # Redraw scheduler: see request_redraw()
+        self.dirty = set() # Pending parts: "view", "grid", "shape", "stats"
+        self.redraw_after = None
+        self.redraw_requested_at = None # perf_counter() of the first request in the pending burst
+        self.last_redraw_at = 0.0
+        self.redraw_stats = {"requests": 0, "redraws": 0, "grid": 0, "shape": 0, "stats": 0,
+                             "last_ms": 0.0, "max_ms": 0.0, "total_ms": 0.0, "draw_ms": 0.0}
+
+        # Live shell solution, re-solved incrementally as points are edited
+        self.solver_cache = {}
+        self.current_shell = None # (profile, material, solver, guidmap_signature(), (penalty, placements, fallbacks))
+
+        # Unchanged outline + settings: EXPORT copies the earlier blueprint instead of regenerating
+        self.result_cache = ResultCache()
+        # Stage outputs of recent exports: changing one setting only reruns the stages after it
+        self.stage_memo = StageMemo()
+
+        # Background export state
+        self.export_thread = None
+        self.export_key = None # design_key() of the running export
+        self.export_queue = None
+        self.export_cancel = None
+
+        # Speculative background build of the current design; EXPORT then only restores it and saves
+        self.spec_after = None # Pending debounce timer
+        self.spec_thread = None
+        self.spec_queue = None
+        self.spec_cancel = None
+        self.spec_key = None # design_key() being built or last built
+        self.spec_ready = False
+        self.export_after_spec = False # EXPORT clicked while the current design was still building
 
         self.setup_ui()
         self.load_settings()
+        for var in (self.var_height, self.var_undercut, self.var_floor, self.var_thickness):
+            var.trace_add("write", lambda *_: self.schedule_speculation())
+        self.var_limit_length.trace_add("write", lambda *_: self.request_redraw("view"))
+        self.root.bind("<F3>", lambda e: self.show_redraw_stats())
 
     def setup_ui(self):
         self.main_container = tk.Frame(self.root, bg=THEME_PANEL_BG)
@@ -88,6 +133,10 @@ class HullDesigner:
         self.lbl_stats_len.pack(anchor="w")
         self.lbl_stats_beam = tk.Label(grp_stats, text="Beam: 1m", width=15, anchor="w", **lbl_opts)
         self.lbl_stats_beam.pack(anchor="w")
+        self.lbl_stats_shell = tk.Label(grp_stats, text="Shell: -", width=15, anchor="w", **lbl_opts)
+        self.lbl_stats_shell.pack(anchor="w")
+        self.lbl_stats_result = tk.Label(grp_stats, text="Build: -", width=15, anchor="w", **lbl_opts)
+        self.lbl_stats_result.pack(anchor="w")
 
         # --- DESIGN LIMITS ---
         grp_canvas = tk.LabelFrame(self.controls, text="Design Limits", bg=THEME_PANEL_BG, font=("MS Sans Serif", 9))
@@ -105,9 +154,15 @@ class HullDesigner:
 
         tk.Label(grp_dim, text="Material:", **lbl_opts).pack(anchor="w")
         # Restricted material options per user request
-        mat_options = ["Alloy", "Metal", "Wood", "Heavy", "Stone"]
+        mat_options = list(MATERIALS) + [ALL_MATERIALS]
         self.cbo_mat = ttk.Combobox(grp_dim, textvariable=self.var_material, values=mat_options, state="readonly", width=12)
         self.cbo_mat.pack(pady=2)
+        self.cbo_mat.bind("<<ComboboxSelected>>", lambda e: self.refresh_solution())
+
+        tk.Label(grp_dim, text="Solver:", **lbl_opts).pack(anchor="w")
+        self.cbo_solver = ttk.Combobox(grp_dim, textvariable=self.var_solver, values=list(SOLVER_CHOICES), state="readonly", width=16)
+        self.cbo_solver.pack(pady=2)
+        self.cbo_solver.bind("<<ComboboxSelected>>", lambda e: self.refresh_solution())
 
         tk.Label(grp_dim, text="Deck Height:", **lbl_opts).pack(anchor="w")
         tk.Spinbox(grp_dim, from_=1, to=50, textvariable=self.var_height, width=10).pack(pady=2)
@@ -118,7 +173,7 @@ class HullDesigner:
         # --- ARMOR THICKNESS ---
         self.var_thickness = tk.IntVar(value=2)
         tk.Label(grp_dim, text="Armor Thickness:", **lbl_opts).pack(anchor="w")
-        tk.Spinbox(grp_dim, from_=1, to=5, textvariable=self.var_thickness, width=10).pack(pady=2)
+        tk.Spinbox(grp_dim, from_=1, to=MAX_THICKNESS, textvariable=self.var_thickness, width=10).pack(pady=2)
         # ----------------------------
 
         # --- OUTPUT PATH ---
@@ -138,6 +193,17 @@ class HullDesigner:
                                     bg=THEME_PANEL_BG, relief=tk.RAISED, bd=3, font=("MS Sans Serif", 9, "bold"), pady=5)
         self.btn_export.pack(pady=10, fill=tk.X)
 
+        self.progress_bar = ttk.Progressbar(self.controls, mode="determinate", maximum=len(EXPORT_STAGES))
+        self.progress_bar.pack(fill=tk.X)
+        self.lbl_progress = tk.Label(self.controls, text="", bg=THEME_PANEL_BG, fg="#444")
+        self.lbl_progress.pack()
+        self.btn_cancel = tk.Button(self.controls, text="Cancel", command=self.cancel_export, state=tk.DISABLED,
+                                    bg=THEME_PANEL_BG, relief=tk.RAISED, bd=2)
+        self.btn_cancel.pack(pady=2, fill=tk.X)
+
+        tk.Button(self.controls, text="Sweep...", command=self.open_sweep,
+                  bg=THEME_PANEL_BG, relief=tk.RAISED, bd=2).pack(pady=2, fill=tk.X)
+
         # --- USAGE INSTRUCTIONS
         self.lbl_info = tk.Label(self.controls, text="L-Click: Add Point\nR-Click: Undo\n\nDraw on either side\nof the center line.",
                                  justify=tk.LEFT, bg=THEME_PANEL_BG, fg="#444")
@@ -155,6 +221,8 @@ class HullDesigner:
 
         self.canvas = tk.Canvas(self.canvas_frame, bg=THEME_BG, highlightthickness=0)
         self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.grid_pool = [] # [line item, colour or None while hidden], reused by every draw_grid()
+        self.grid_marks = None # (center line, BOW label, STERN label)
 
         self.canvas.bind("<Configure>", self.on_resize)
         self.canvas.bind("<Button-1>", self.add_point)
@@ -206,52 +274,88 @@ class HullDesigner:
             self.lbl_warning.config(text="")
 
     def load_preset1(self):
-        self.points = [
-            (0, 0),   # Tip (1m Beam)
-            (4, 2),   # User Point 1
-            (14, 4),  # User Point 2
-            (39, 6),  # User Point 3
-            (69, 6),  # User Point 4
-            (85, 5),  # User Point 5
-            (100, 3)  # User Point 6
-        ]
+        self.points = list(PRESET_HULLS["100m"])
         self.var_limit_length.set(100)
-        self.recalc_view()
-        self.update_stats()
-        self.check_slope_warning()
+        self.request_redraw("view", "stats")
+        self.refresh_solution()
 
     def load_preset2(self):
-        self.points = [
-            (0, 0),   # Tip (1m Beam)
-            (4, 4),   # User Point 1
-            (20, 9),  # User Point 2
-            (50, 14),  # User Point 3
-            (80, 17),  # User Point 4
-            (140, 17),  # User Point 5
-            (170, 15),  # User Point 6
-            (190, 11),  # User Point 7
-            (200, 7)  # User Point 8
-        ]
+        self.points = list(PRESET_HULLS["200m"])
         self.var_limit_length.set(200)
-        self.recalc_view()
-        self.update_stats()
-        self.check_slope_warning()
+        self.request_redraw("view", "stats")
+        self.refresh_solution()
 
     def on_resize(self, event):
         self.phys_w = event.width
         self.phys_h = event.height
-        self.recalc_view()
+        self.request_redraw("view")
 
     def force_redraw(self):
-        self.recalc_view()
+        self.request_redraw("view")
+
+    def request_redraw(self, *parts):
+        """Marks parts of the view dirty and schedules one redraw for the whole burst.
+
+        "view" recomputes the scale (and implies grid and shape), "grid" the
+        grid lines, "shape" the outline, "stats" the stats labels and slope
+        warning. The redraw runs when Tk is idle, but never sooner than
+        REDRAW_FRAME_MS after the previous one.
+        """
+        self.dirty.update(parts)
+        self.redraw_stats["requests"] += 1
+        if self.redraw_after is not None: return
+        self.redraw_requested_at = time.perf_counter()
+        wait_ms = REDRAW_FRAME_MS - (self.redraw_requested_at - self.last_redraw_at) * 1000
+        if wait_ms > 0:
+            self.redraw_after = self.root.after(int(wait_ms) + 1, self.flush_redraw)
+        else:
+            self.redraw_after = self.root.after_idle(self.flush_redraw)
+
+    def flush_redraw(self):
+        self.redraw_after = None
+        dirty, self.dirty = self.dirty, set()
+        start = time.perf_counter()
+        if "view" in dirty and self.recalc_view():
+            dirty |= {"grid", "shape"}
+        stats = self.redraw_stats
+        if "grid" in dirty:
+            self.draw_grid()
+            stats["grid"] += 1
+        if "shape" in dirty:
+            self.redraw_shape()
+            stats["shape"] += 1
+        if "stats" in dirty:
+            self.update_stats()
+            self.check_slope_warning()
+            stats["stats"] += 1
+
+        self.last_redraw_at = time.perf_counter()
+        latency_ms = (self.last_redraw_at - self.redraw_requested_at) * 1000
+        stats["redraws"] += 1
+        stats["last_ms"] = latency_ms
+        stats["max_ms"] = max(stats["max_ms"], latency_ms)
+        stats["total_ms"] += latency_ms
+        stats["draw_ms"] += (self.last_redraw_at - start) * 1000
+
+    def redraw_report(self):
+        stats = self.redraw_stats
+        mean = stats["total_ms"] / stats["redraws"] if stats["redraws"] else 0.0
+        return (f"{stats['requests']} requests -> {stats['redraws']} redraws "
+                f"(grid {stats['grid']}, shape {stats['shape']}, stats {stats['stats']})\n"
+                f"Request to redraw: last {stats['last_ms']:.1f} ms, mean {mean:.1f} ms, max {stats['max_ms']:.1f} ms\n"
+                f"Time spent drawing: {stats['draw_ms']:.0f} ms")
+
+    def show_redraw_stats(self):
+        messagebox.showinfo("Redraw Stats", self.redraw_report())
 
     def recalc_view(self):
+        # Recomputes the scale; True when the view is usable and needs redrawing
         try:
             log_len = int(self.var_limit_length.get())
-        except ValueError:
-            return
+        except (tk.TclError, ValueError):
+            return False
 
-        if self.phys_w <= 1 or self.phys_h <= 1: return
+        if self.phys_w <= 1 or self.phys_h <= 1 or log_len <= 0: return False
 
         padding_px = 40
         available_h = self.phys_h - padding_px
@@ -263,16 +367,15 @@ class HullDesigner:
         total_width_blocks = available_w / self.grid_size
         half_width = int(total_width_blocks / 2)
         self.var_limit_width.set(half_width)
+        self.view_half_width = half_width
+        self.view_length = log_len
 
         self.offset_x = 0
         self.offset_y = 20
-
-        self.draw_grid()
-        self.redraw_shape()
-        self.update_stats()
+        return True
 
     def to_screen(self, gx, gz):
-        log_w_half = int(self.var_limit_width.get())
+        log_w_half = self.view_half_width
         center_screen_x = self.offset_x + (log_w_half * self.grid_size)
 
         sx = center_screen_x + (gx * self.grid_size)
@@ -280,7 +383,7 @@ class HullDesigner:
         return sx, sy
 
     def to_grid(self, sx, sy):
-        log_w_half = int(self.var_limit_width.get())
+        log_w_half = self.view_half_width
         center_screen_x = self.offset_x + (log_w_half * self.grid_size)
 
         dist_px = sx - center_screen_x
@@ -288,47 +391,80 @@ class HullDesigner:
         gz = (sy - self.offset_y) / self.grid_size
         return gx, gz
 
-    def draw_grid(self):
-        self.canvas.delete("grid")
-
-        log_w_half = int(self.var_limit_width.get())
-        log_h = int(self.var_limit_length.get())
+    def grid_lines(self):
+        """(x0, y0, x1, y1, colour) of each grid line inside the canvas, at the current level of detail."""
+        log_w_half = self.view_half_width
+        log_h = self.view_length
         center_x = self.offset_x + (log_w_half * self.grid_size)
 
-        start_x = 0
-        end_x = self.phys_w
         start_y = self.offset_y
         end_y = self.offset_y + (log_h * self.grid_size)
-
-        for i in range(log_w_half * 2 + 1):
-            xr = center_x + (i * self.grid_size)
-            if xr <= end_x:
-                is_major = i % 10 == 0
-                color = THEME_GRID_MAJOR if is_major else THEME_GRID_MINOR
-                if is_major or self.grid_size > 3:
-                    self.canvas.create_line(xr, start_y, xr, end_y, fill=color, tags="grid")
-            xl = center_x - (i * self.grid_size)
-            if xl >= start_x:
-                is_major = i % 10 == 0
-                color = THEME_GRID_MAJOR if is_major else THEME_GRID_MINOR
-                if is_major or self.grid_size > 3:
-                    self.canvas.create_line(xl, start_y, xl, end_y, fill=color, tags="grid")
-
-        for i in range(log_h + 1):
+        top, bottom = max(start_y, 0), min(end_y, self.phys_h)
+
+        if self.grid_size > GRID_MINOR_MIN_PX: step = 1
+        elif self.grid_size * 10 >= GRID_MAJOR_MIN_PX: step = 10
+        else: step = 100
+
+        lines = []
+        # Columns out from the center line, as far as either canvas edge (and the design width)
+        reach = min(log_w_half * 2, int(max(center_x, self.phys_w - center_x) / self.grid_size))
+        for i in range(0, reach + 1, step):
+            color = THEME_GRID_MAJOR if i % 10 == 0 else THEME_GRID_MINOR
+            for x in ((center_x,) if i == 0 else (center_x + i * self.grid_size, center_x - i * self.grid_size)):
+                if 0 <= x <= self.phys_w:
+                    lines.append((x, start_y, x, end_y, color))
+
+        # Rows, skipping those above or below the canvas
+        first = max(0, int((top - start_y) / self.grid_size) // step * step)
+        last = min(log_h, int((bottom - start_y) / self.grid_size) + 1)
+        for i in range(first, last + 1, step):
             y = start_y + (i * self.grid_size)
-            is_major = i % 10 == 0
-            color = THEME_GRID_MAJOR if is_major else THEME_GRID_MINOR
-            if is_major or self.grid_size > 3:
-                self.canvas.create_line(start_x, y, end_x, y, fill=color, tags="grid")
+            color = THEME_GRID_MAJOR if i % 10 == 0 else THEME_GRID_MINOR
+            lines.append((0, y, self.phys_w, y, color))
+        return lines
 
-        self.canvas.create_line(center_x, start_y, center_x, end_y, fill=THEME_CENTER_LINE, width=2, dash=(6, 4), tags="grid")
-        self.canvas.create_text(center_x, start_y - 10, text="BOW", fill="#444", font=("Arial", 10, "bold"), tags="grid")
-        self.canvas.create_text(center_x, end_y + 10, text="STERN", fill="#444", font=("Arial", 10, "bold"), tags="grid")
+    def draw_grid(self):
+        # Moves pooled line items into place with coords(); items are only created
+        # when the view needs more lines than ever before, and spares are hidden
+        lines = self.grid_lines()
+        created = False
+        for n, (x0, y0, x1, y1, color) in enumerate(lines):
+            if n < len(self.grid_pool):
+                entry = self.grid_pool[n]
+                self.canvas.coords(entry[0], x0, y0, x1, y1)
+                if entry[1] != color:
+                    self.canvas.itemconfigure(entry[0], fill=color, state=tk.NORMAL)
+                    entry[1] = color
+            else:
+                self.grid_pool.append([self.canvas.create_line(x0, y0, x1, y1, fill=color, tags="grid"), color])
+                created = True
+        for entry in self.grid_pool[len(lines):]:
+            if entry[1] is not None:
+                self.canvas.itemconfigure(entry[0], state=tk.HIDDEN)
+                entry[1] = None
+
+        log_w_half = self.view_half_width
+        log_h = self.view_length
+        center_x = self.offset_x + (log_w_half * self.grid_size)
+        start_y = self.offset_y
+        end_y = self.offset_y + (log_h * self.grid_size)
+        if self.grid_marks is None:
+            self.grid_marks = (
+                self.canvas.create_line(0, 0, 0, 0, fill=THEME_CENTER_LINE, width=2, dash=(6, 4), tags="gridmark"),
+                self.canvas.create_text(0, 0, text="BOW", fill="#444", font=("Arial", 10, "bold"), tags="gridmark"),
+                self.canvas.create_text(0, 0, text="STERN", fill="#444", font=("Arial", 10, "bold"), tags="gridmark"))
+        center, bow, stern = self.grid_marks
+        self.canvas.coords(center, center_x, start_y, center_x, end_y)
+        self.canvas.coords(bow, center_x, start_y - 10)
+        self.canvas.coords(stern, center_x, end_y + 10)
+        if created:
+            # New lines stack on top; keep every grid line under the marks and the hull
+            self.canvas.tag_lower("grid")
 
     def update_cursor(self, event):
         gx, gz = self.to_grid(event.x, event.y)
         width_m, length_m = int(abs(gx)) * 2 + 1, int(abs(gz))
-        max_places = max(len(str(self.var_limit_length.get())), len(str(self.offset_y)))
+        max_places = max(len(str(self.view_length)), len(str(self.offset_y)))
         self.lbl_cursor.config(text=f"Width at Cursor: {width_m:0>{max_places}}m\nLength at Cursor: {length_m:0>{max_places}}m")
 
     def update_stats(self):
@@ -350,16 +486,14 @@ class HullDesigner:
         if gz < 0: gz = 0
         if not self.points or gz > self.points[-1][0]:
             self.points.append((gz, gx))
-            self.redraw_shape()
-            self.update_stats()
-            self.check_slope_warning()
+            self.request_redraw("shape", "stats")
+            self.refresh_solution()
 
     def remove_point(self, event):
         if len(self.points) > 1:
             self.points.pop()
-            self.redraw_shape()
-            self.update_stats()
-            self.check_slope_warning()
+            self.request_redraw("shape", "stats")
+            self.refresh_solution()
 
     def redraw_shape(self):
         self.canvas.delete("shape")
@@ -383,635 +517,427 @@ class HullDesigner:
             lx, ly = self.to_screen(-x, z)
             self.canvas.create_oval(lx-2, ly-2, lx+2, ly+2, fill="#BBB", outline="black", tags="points")
 
+    def refresh_solution(self):
+        # Keep the solved outer shell in step with the outline. solver_cache holds
+        # the previous run's checkpoints, so only the edited tail is re-solved.
+        if len(self.points) < 2:
+            self.current_shell = None
+            self.lbl_stats_shell.config(text="Shell: -")
+            self.schedule_speculation()
+            return
+
+        profile = build_profile(self.points)
+        material, _ = self.selected_materials()
+        solver = SOLVER_CHOICES.get(self.var_solver.get(), "greedy")
+        generator = BlueprintGenerator(profile, 0, 1, 0, False, "", material, 1,
+                                       headless=True, solver=solver, solver_cache=self.solver_cache)
+        if 1 not in generator.beam_guids:
+            self.current_shell = None
+            self.lbl_stats_shell.config(text="Shell: -")
+            self.schedule_speculation()
+            return
+
+        penalty, shell = generator.solve_shell(0, profile)
+        self.current_shell = (profile.tolist(), material, solver, guidmap_signature(),
+                              (penalty, shell, generator.solver_fallbacks))
+        self.lbl_stats_shell.config(text=f"Shell: {shell.block_count()} blocks")
+        self.schedule_speculation()
+
     def run_generator(self):
         if len(self.points) < 2: return
-        max_z = self.points[-1][0]
-        z_coords = [p[0] for p in self.points]
-        x_coords = [p[1] for p in self.points]
-        full_z = np.arange(max_z + 1)
-        full_x = np.interp(full_z, z_coords, x_coords)
-        hull_profile = np.round(full_x).astype(int)
+        if self.export_thread is not None: return # Export already running
+        if self.spec_thread is not None:
+            if self.spec_key == self.design_key():
+                # Let the background build finish; poll_speculation() exports right after
+                self.export_after_spec = True
+                self.btn_export.config(state=tk.DISABLED)
+                self.lbl_progress.config(text="Finishing background build...")
+                return
+            self.spec_cancel.set()
+        self.export_key = self.design_key()
+        hull_profile = build_profile(self.points)
 
         height = int(self.var_height.get())
         undercut = int(self.var_undercut.get())
         do_floor = self.var_floor.get()
         center_offset = int(self.var_limit_width.get())
         save_path = self.var_save_path.get()
-        material = self.var_material.get()
+        material, materials = self.selected_materials()
+        solver = SOLVER_CHOICES.get(self.var_solver.get(), "greedy")
 
         # --- FIX START ---
         # 1. Get the thickness from the GUI variable
         thickness = int(self.var_thickness.get())
 
         # 2. Pass 'thickness' as the last argument
-        generator = BlueprintGenerator(hull_profile, center_offset, height, undercut, do_floor, save_path, material, thickness)
+        self.export_queue = queue.Queue()
+        self.export_cancel = threading.Event()
+        progress = lambda stage, fraction, q=self.export_queue: q.put(("progress", stage, fraction))
+        shell = self.matching_shell(hull_profile, material, solver)
+        generator = BlueprintGenerator(hull_profile, center_offset, height, undercut, do_floor, save_path, material, thickness,
+                                       headless=True, solver=solver, progress=progress, cancel_event=self.export_cancel,
+                                       shell=shell, armor_workers=os.cpu_count() or 1, result_cache=self.result_cache,
+                                       stage_memo=self.stage_memo)
         # --- FIX END ---
 
-        generator.generate()
-
-        if save_path:
-            final_location = os.path.join(save_path, OUTPUT_FILENAME)
-        else:
-            final_location = os.path.join(BASE_DIR, OUTPUT_FILENAME)
-
-        messagebox.showinfo("Success", f"Generated {final_location}")
-
-
-class BlueprintGenerator:
-    def __init__(self, profile, center_offset, height, undercut, do_floor, save_path, material, thickness):
-        self.profile = profile
-        self.center_offset = center_offset
-        self.height = height
-        self.undercut = undercut
-        self.do_floor = do_floor
-        self.save_path = save_path
-        self.material = material
-        self.thickness = thickness # <--- Armor Thickness
-        self.placements = []
-
-        # Initialize empty dictionaries (No hardcoding!)
-        self.beam_guids = {}
-        self.slope_guids = {}
-        self.offset_guids = {}
-        self.load_assets()
-
-
-    def load_assets(self):
-        # Reset to ensure clean state
-        self.beam_guids = {}
-        self.slope_guids = {}
-        self.offset_guids = {}
-
-        target_mat = self.material.lower() # alloy, metal, wood, heavy, stone
-
-        # Load from both JSON files in the BASE_DIR
-        loaded_data = {}
-        for fname in GUIDMAP_FILES:
-            fpath = os.path.join(BASE_DIR, fname)
-            if os.path.exists(fpath):
-                try:
-                    with open(fpath, 'r') as f:
-                        data = json.load(f)
-                        loaded_data.update(data)
-                except Exception as e:
-                    print(f"Error loading {fname}: {e}")
-
-        for name, guid in loaded_data.items():
-            name_lower = name.lower()
-
-            # --- 1m Block Logic (from standard blocks in guidmap-blocks.json) ---
-            # These usually do NOT have "1m" in the name in the json file provided
-            is_1m = False
-
-            if target_mat == "alloy":
-                if "light-weight alloy block" in name_lower: is_1m = True
-            elif target_mat == "heavy":
-                if name_lower == "heavy armour": is_1m = True
-            else:
-                # Wood, Metal, Stone follow "{Material} Block" pattern
-                if f"{target_mat} block" in name_lower: is_1m = True
-
-            if is_1m:
-                self.beam_guids[1] = guid
-                continue
-
-            # --- 2m, 3m, 4m and Slope/Corner Logic ---
-            # Filter for material presence in name
-            check_str = "heavy armour" if target_mat == "heavy" else target_mat
-            if check_str not in name_lower: continue
-
-            length = 0
-            if "4m" in name_lower: length = 4
-            elif "3m" in name_lower: length = 3
-            elif "2m" in name_lower: length = 2
-            elif "1m" in name_lower: length = 1 # Handle explicit "1m" in slopes/corners
-
-            if length == 0: continue
-
-            # Categorize
-            # 1. Beams (Exclude slopes/corners)
-            if "beam" in name_lower and "slope" not in name_lower and "corner" not in name_lower:
-                self.beam_guids[length] = guid
-
-            # 2. Slopes
-            elif "slope" in name_lower:
-                self.slope_guids[length] = guid
-
-            # 3. Offsets/Corners
-            elif "offset" in name_lower and "inverted" not in name_lower:
-                if length not in self.offset_guids:
-                    self.offset_guids[length] = {"left": None, "right": None}
-
-                if "left" in name_lower:
-                    self.offset_guids[length]["left"] = guid
-                elif "right" in name_lower:
-                    self.offset_guids[length]["right"] = guid
-
-    def generate(self):
-        if 1 not in self.beam_guids:
-             messagebox.showerror("Error", f"Could not find 1m Block ID for '{self.material}' in JSON maps.")
-             return
-
-        print("Starting Solver...")
-
-        # 1. Generate ONLY the Outer Shell (Layer 0)
-        # We use the standard full profile.
-        self.placements = [] # Clear previous
-        score, result = self.simulate_hull(0, self.profile, is_inner_layer=False)
-
-        if result:
-            self.placements.extend(result)
-        else:
-            # Fallback
-            _, fb = self.simulate_hull(1, self.profile, is_inner_layer=False)
-            self.placements.extend(fb)
-
-        # 2. Construct the full hollow shape
-        self.fill_stern()
-        self.stack_layers()     # Extrude vertically
-        self.generate_undercut() # Create the bottom curve
-
-        if self.do_floor:
-            self.generate_floor()
-
-        # 3. NEW: Apply thickness by filling inwards
-        if self.thickness > 1:
-            print(f"Applying {self.thickness}m armor thickness...")
-            self.apply_armor_thickness()
-
-        self.save_to_blueprint()
-
-    def fill_stern(self):
-        if not self.profile.any(): return
-        stern_x_index = self.profile[-1]
-        dist_from_center = stern_x_index
-        z_pos = 0
-        start_x = -(dist_from_center - 1)
-        end_x = (dist_from_center - 1)
-        guid_1m = self.beam_guids.get(1)
-        if not guid_1m: return
-        if start_x <= end_x:
-            for x in range(start_x, end_x + 1):
-                beam_props = {"type": "beam", "len": 1, "offset": 0, "is_stern": False}
-                entry = {'pos': (x, 10, z_pos), 'rot': ROT_BEAM, 'guid': guid_1m, 'props': beam_props}
-                self.placements.append(entry)
-
-    def stack_layers(self):
-        if self.height <= 1: return
-        base_layer = list(self.placements)
-        self.placements = []
-        for h in range(self.height):
-            offset_y = h
-            for p in base_layer:
-                new_p = copy.deepcopy(p)
-                x, y, z = new_p['pos']
-                new_p['pos'] = (x, y - offset_y, z)
-                self.placements.append(new_p)
-
-    def generate_undercut(self):
-        if self.undercut <= 0: return
-
-        # Find the bottom-most blocks of the current layer
-        if not self.placements: return
-        min_y = min(p['pos'][1] for p in self.placements)
-        parent_layer = [p for p in self.placements if p['pos'][1] == min_y]
-
-        max_z = max(p['pos'][2] for p in parent_layer) if parent_layer else 0
-        ship_center_z = max_z / 2
-
-        for u in range(1, self.undercut + 1):
-            current_undercut_y = min_y - u
-            new_layer = []
-            occupied_coords = set()
-            placed_offsets = []
-
-            # 1. Place Slopes/Offsets (The curved part of the undercut)
-            for parent in parent_layer:
-                props = parent['props']
-                if props['type'] == 'beam': continue
-
-                if props['type'] == 'slope':
-                    length = props['len']
-                    is_stern = props['is_stern']
-                    rot = parent['rot']
-
-                    offset_guid = None
-                    is_left_rot = rot in [ROT_LEFT_IN, ROT_LEFT_STERN, ROT_LEFT_OUT]
-                    is_right_rot = rot in [ROT_RIGHT_IN, ROT_RIGHT_STERN, ROT_RIGHT_OUT]
-
-                    if is_stern:
-                        if is_left_rot and length in self.offset_guids: offset_guid = self.offset_guids[length]["left"]
-                        elif is_right_rot and length in self.offset_guids: offset_guid = self.offset_guids[length]["right"]
-                    else:
-                        if is_left_rot and length in self.offset_guids: offset_guid = self.offset_guids[length]["right"]
-                        elif is_right_rot and length in self.offset_guids: offset_guid = self.offset_guids[length]["left"]
-
-                    if not offset_guid: continue
-
-                    z_shift = 1 if is_stern else -1
-                    x, y, z = parent['pos']
-                    new_pos = (x, current_undercut_y, z + z_shift)
-
-                    if is_stern:
-                        for i in range(length): occupied_coords.add((new_pos[0], new_pos[2] - i))
-                    else:
-                        for i in range(length): occupied_coords.add((new_pos[0], new_pos[2] + i))
-
-                    new_entry = {
-                        'pos': new_pos, 'rot': rot, 'guid': offset_guid, 'props': props
-                    }
-                    new_layer.append(new_entry)
-                    placed_offsets.append(new_entry)
-
-            # 2. Fill Straight Sections (Beams)
-            raw_beam_voxels = []
-
-            # A. Propagate beams downwards (The vertical walls)
-            for parent in parent_layer:
-                if parent['props']['type'] == 'beam':
-                    length = parent['props']['len']
-                    px, py, pz = parent['pos']
-
-                    # Shift based on position relative to center to align nicely
-                    beam_z_shift = -1 if pz > ship_center_z else 1
-                    shifted_pz = pz + beam_z_shift
-
-                    for z_offset in range(length):
-                        voxel_z = shifted_pz + z_offset
-                        voxel_x = px
-                        if (voxel_x, voxel_z) not in occupied_coords:
-                             raw_beam_voxels.append((voxel_x, voxel_z))
-                             occupied_coords.add((voxel_x, voxel_z))
-
-            # B. Fill horizontally from offsets (The transition)
-            # IMPORTANT CHANGE: We only fill 1 block inward to maintain shell thickness.
-            # The inner loop will handle the rest.
-            for off in placed_offsets:
-                x = off['pos'][0]
-                z_anchor = off['pos'][2]
-                is_stern = off['props']['is_stern']
-
-                if is_stern:
-                    start_z = z_anchor + 1
-                    direction = 1
-                else:
-                    start_z = z_anchor - 1
-                    direction = -1
-
-                current_z = start_z
-
-                # --- LIMIT FILL TO 1 BLOCK ---
-                # We check if the spot is empty. If so, fill it and stop.
-                # This creates a single-layer shell for the undercut.
-                if (x, current_z) not in occupied_coords:
-                    raw_beam_voxels.append((x, current_z))
-                    occupied_coords.add((x, current_z))
-                # -----------------------------
-
-            optimized_beams = self.optimize_beams(raw_beam_voxels, current_undercut_y)
-            new_layer.extend(optimized_beams)
+        # Generate off the Tk thread; poll_export() relays progress back via the queue
+        self.export_thread = threading.Thread(target=self.export_worker, args=(generator, self.export_queue, materials),
+                                              daemon=True)
+        self.btn_export.config(state=tk.DISABLED)
+        self.btn_cancel.config(state=tk.NORMAL)
+        self.progress_bar["value"] = 0
+        self.lbl_progress.config(text="Starting...")
+        self.export_thread.start()
+        self.root.after(EXPORT_POLL_MS, self.poll_export)
+
+    def matching_shell(self, profile, material, solver):
+        # Reuse the live shell when it matches what is being built, with the GUID maps it was solved from
+        if self.current_shell is not None and \
+                self.current_shell[:4] == (profile.tolist(), material, solver, guidmap_signature()):
+            return self.current_shell[4]
+        return None
+
+    def design_key(self):
+        # Everything the built hull depends on; None while there is no hull or a field is mid-edit
+        if len(self.points) < 2: return None
+        try:
+            return (tuple(self.points), int(self.var_height.get()), int(self.var_undercut.get()),
+                    bool(self.var_floor.get()), self.selected_materials()[0], int(self.var_thickness.get()),
+                    SOLVER_CHOICES.get(self.var_solver.get(), "greedy"))
+        except (tk.TclError, ValueError):
+            return None
+
+    def schedule_speculation(self):
+        # Debounced: each edit restarts the timer and stops a build of a design that is now stale
+        if self.spec_after is not None: self.root.after_cancel(self.spec_after)
+        if self.spec_thread is not None and self.spec_key != self.design_key():
+            self.spec_cancel.set()
+        self.spec_after = self.root.after(SPECULATE_DELAY_MS, self.start_speculation)
+        self.update_result_status()
+
+    def start_speculation(self):
+        self.spec_after = None
+        key = self.design_key()
+        if key is None or (key == self.spec_key and (self.spec_ready or self.spec_thread is not None)):
+            self.update_result_status()
+            return
+        if self.export_thread is not None or self.spec_thread is not None:
+            # An export or a cancelled build still holds the CPU: try again shortly
+            self.spec_after = self.root.after(SPECULATE_DELAY_MS, self.start_speculation)
+            return
 
-            self.placements.extend(new_layer)
-            parent_layer = new_layer
+        points, height, undercut, do_floor, material, thickness, solver = key
+        profile = build_profile(list(points))
+        self.spec_key = key
+        self.spec_ready = False
+        self.spec_cancel = threading.Event()
+        self.spec_queue = queue.Queue()
+        # One thread, no armor pool: stays out of the way of the UI and a real export
+        generator = BlueprintGenerator(profile, 0, height, undercut, do_floor, "", material, thickness,
+                                       headless=True, solver=solver, cancel_event=self.spec_cancel,
+                                       shell=self.matching_shell(profile, material, solver), stage_memo=self.stage_memo)
+        self.spec_thread = threading.Thread(target=self.speculation_worker, args=(generator, self.spec_queue), daemon=True)
+        self.spec_thread.start()
+        self.update_result_status()
+        self.root.after(EXPORT_POLL_MS, self.poll_speculation)
+
+    @staticmethod
+    def speculation_worker(generator, results):
+        # Fills the stage memo; nothing is written to disk
+        try:
+            generator.traced(generator.build_hull)
+            results.put("ready")
+        except GenerationCancelled:
+            results.put("cancelled")
+        except Exception:
+            results.put("failed") # EXPORT reruns it and reports the error
+
+    def poll_speculation(self):
+        try:
+            outcome = self.spec_queue.get_nowait()
+        except queue.Empty:
+            self.root.after(EXPORT_POLL_MS, self.poll_speculation)
+            return
 
-    def generate_floor(self):
-        if not self.placements: return
+        self.spec_thread = None
+        self.spec_ready = outcome == "ready"
+        if outcome == "cancelled": self.spec_key = None
+        self.update_result_status()
+        if self.export_after_spec:
+            self.export_after_spec = False
+            self.btn_export.config(state=tk.NORMAL)
+            self.run_generator()
+
+    def update_result_status(self):
+        key = self.design_key()
+        if key is None:
+            text = "Build: -"
+        elif key != self.spec_key:
+            text = "Build: stale"
+        elif self.spec_thread is not None:
+            text = "Build: running"
+        else:
+            text = "Build: ready" if self.spec_ready else "Build: failed"
+        self.lbl_stats_result.config(text=text)
 
-        min_y = min(p['pos'][1] for p in self.placements)
-        occupied = set()
+    def selected_materials(self):
+        # (material the shell is solved for, materials to export or None for just that one)
+        material = self.var_material.get()
+        if material == ALL_MATERIALS:
+            return MATERIALS[0], list(MATERIALS)
+        return material, None
 
-        for p in self.placements:
-            if p['pos'][1] == min_y:
-                length = p['props']['len']
-                px, py, pz = p['pos']
-                is_stern = p['props'].get('is_stern', False)
+    @staticmethod
+    def export_worker(generator, results, materials=None):
+        # Runs on the worker thread: never touch Tk from here
+        try:
+            if materials:
+                out_file = generator.generate_materials(materials, workers=os.cpu_count() or 1)
+            else:
+                out_file = generator.generate()
+            results.put(("done", (out_file, generator.report)))
+        except GenerationCancelled:
+            results.put(("cancelled", None))
+        except Exception as e:
+            results.put(("error", f"{e}"))
 
-                if is_stern:
-                    for i in range(length): occupied.add((px, pz - i))
-                else:
-                    for i in range(length): occupied.add((px, pz + i))
-
-        if not occupied: return
-
-        min_z = min(z for x, z in occupied)
-        max_z = max(z for x, z in occupied)
-
-        raw_floor_voxels = []
-
-        for z in range(min_z, max_z + 1):
-            xs_at_z = [x for x, _z in occupied if _z == z]
-            if not xs_at_z: continue
-
-            min_x = min(xs_at_z)
-            max_x = max(xs_at_z)
-
-            for x in range(min_x + 1, max_x):
-                if (x, z) not in occupied:
-                    raw_floor_voxels.append((x, z))
-                    occupied.add((x, z))
-
-        floor_beams = self.optimize_beams(raw_floor_voxels, min_y)
-        self.placements.extend(floor_beams)
-
-    def optimize_beams(self, voxels, y_level):
-        by_x = {}
-        for x, z in voxels:
-            if x not in by_x: by_x[x] = []
-            by_x[x].append(z)
-
-        optimized = []
-        for x, z_list in by_x.items():
-            z_list = sorted(list(set(z_list)))
-            if not z_list: continue
-
-            runs = []
-            if z_list:
-                current_run = [z_list[0]]
-                for i in range(1, len(z_list)):
-                    if z_list[i] == z_list[i-1] + 1:
-                        current_run.append(z_list[i])
-                    else:
-                        runs.append(current_run)
-                        current_run = [z_list[i]]
-                runs.append(current_run)
-
-            for run in runs:
-                start_z = run[0]
-                total_len = len(run)
-                current_fill_z = start_z
-
-                while total_len > 0:
-                    chosen = 1
-                    for size in [4, 3, 2, 1]:
-                        if size <= total_len and size in self.beam_guids:
-                            chosen = size
-                            break
-
-                   # if chosen is None:
-                    #    current_fill_z += 1
-                    #    total_len -= 1
-                    #    continue
-
-                    guid = self.beam_guids[chosen]
-                    props = {"type": "beam", "len": chosen, "offset": 0, "is_stern": False}
-
-                    entry = {
-                        'pos': (x, y_level, current_fill_z),
-                        'rot': ROT_BEAM,
-                        'guid': guid,
-                        'props': props
-                    }
-                    optimized.append(entry)
-                    current_fill_z += chosen
-                    total_len -= chosen
-        return optimized
-
-    def simulate_hull(self, forced_1m_zone, target_profile, is_inner_layer=False):
-        temp_placements = []
-        L = len(target_profile)
-        current_z = 0
-        current_min_len = 1
-        total_penalty = 0
-
-        while current_z < L:
-            x_current = target_profile[current_z]
-            dist_current = x_current
-
-            best_choice = None
-            min_step_cost = float('inf')
-
-            all_lengths = sorted(list(set(list(self.slope_guids.keys()) + list(self.beam_guids.keys()))), reverse=True)
-            limit_len = 99
-            if current_z < forced_1m_zone: limit_len = 1
-
-            candidates = []
-            for l in all_lengths:
-                if l > limit_len: continue
-
-                # If inner layer, ONLY allow Beams (No slopes/offsets)
-                if not is_inner_layer:
-                    if l in self.slope_guids:
-                        candidates.append({"type": "slope", "len": l, "offset": -1, "is_stern": False, "guid": self.slope_guids[l]})
-                        candidates.append({"type": "slope", "len": l, "offset": 1, "is_stern": True, "guid": self.slope_guids[l]})
-
-                if l in self.beam_guids:
-                    candidates.append({"type": "beam", "len": l, "offset": 0, "is_stern": False, "guid": self.beam_guids[l]})
-
-            for cand in candidates:
-                b_len = cand["len"]
-                if current_z + b_len > L: continue
-
-                target_x = target_profile[current_z + b_len - 1]
-                if current_z + b_len < L: target_x = target_profile[current_z + b_len]
-                else: target_x = target_profile[-1]
-
-                dist_ideal = dist_current - cand["offset"]
-                error = abs(target_x - dist_ideal)
-
-                # Relax error slightly for beams-only (staircasing)
-                threshold = 1.0
-                if is_inner_layer: threshold = 1.5
-
-                if error > threshold: continue
-
-                fit_penalty = error * 50
-                len_penalty = (current_min_len - b_len) * 10 if b_len < current_min_len else -(b_len * 2)
-                efficiency_cost = 10
-                total_step_cost = len_penalty + efficiency_cost + fit_penalty
-
-                valid_lookahead = True
-
-                # --- FIX: DISABLE LOOKAHEAD FOR INNER LAYERS ---
-                # We only check lookahead for the outer shell.
-                # Inner shells are allowed to be 'blocky' stairs.
-                if b_len > 1 and not is_inner_layer:
-                    lookahead_z = current_z + int(b_len * 1.5)
-                    if lookahead_z < L:
-                        future_x = target_profile[lookahead_z]
-                        ratio = (lookahead_z - current_z) / b_len
-                        dist_fut_ideal = dist_current - (cand["offset"] * ratio)
-                        if abs(future_x - dist_fut_ideal) > threshold: valid_lookahead = False
-                # -----------------------------------------------
-
-                if not valid_lookahead: continue
-
-                if total_step_cost < min_step_cost:
-                    min_step_cost = total_step_cost
-                    best_choice = cand
-
-            if not best_choice:
-                total_penalty += 200
-                current_min_len = 1
-
-                fb_cands = []
-                if not is_inner_layer and 1 in self.slope_guids:
-                    fb_cands.append({"type": "slope", "len": 1, "offset": -1, "is_stern": False, "guid": self.slope_guids[1]})
-                    fb_cands.append({"type": "slope", "len": 1, "offset": 1, "is_stern": True, "guid": self.slope_guids[1]})
-
-                if 1 in self.beam_guids:
-                    fb_cands.append({"type": "beam", "len": 1, "offset": 0, "is_stern": False, "guid": self.beam_guids.get(1)})
-
-                best_err = float('inf')
-                for c in fb_cands:
-                    if not c["guid"]: continue
-                    if current_z + c["len"] > L: continue
-                    tx = target_profile[current_z+1] if current_z+1 < L else target_profile[-1]
-                    di = dist_current - c["offset"]
-                    if abs(tx - di) < best_err: best_err = abs(tx - di); best_choice = c
-
-                if not best_choice: current_z += 1; continue
-
-            total_penalty += min_step_cost
-            b_len = best_choice["len"]
-            current_min_len = b_len
-
-            z_shift = 1 if best_choice["is_stern"] else b_len
-            placement_z = L - (current_z + z_shift)
-
-            gx_left = -dist_current
-            gx_right = dist_current
-            rot_left = ROT_BEAM
-            rot_right = ROT_BEAM
-
-            if best_choice["type"] == "slope":
-                if best_choice["is_stern"]:
-                    rot_left = ROT_LEFT_STERN
-                    rot_right = ROT_RIGHT_STERN
+    def poll_export(self):
+        finished = None
+        try:
+            while True:
+                msg = self.export_queue.get_nowait()
+                if msg[0] == "progress":
+                    _, stage, fraction = msg
+                    self.progress_bar["value"] = EXPORT_STAGES.index(stage) + fraction
+                    self.lbl_progress.config(text=f"{stage.capitalize()}...")
                 else:
-                    if best_choice["offset"] == -1:
-                        rot_left = ROT_LEFT_OUT; rot_right = ROT_RIGHT_OUT; gx_left -= 1; gx_right += 1
-                    else:
-                        rot_left = ROT_LEFT_IN; rot_right = ROT_RIGHT_IN
-
-            entry_left = {'pos': (gx_left, 10, placement_z), 'rot': rot_left, 'guid': best_choice["guid"], 'props': best_choice}
-            entry_right = {'pos': (gx_right, 10, placement_z), 'rot': rot_right, 'guid': best_choice["guid"], 'props': best_choice}
-
-            temp_placements.append(entry_left)
-            temp_placements.append(entry_right)
-
-            current_z += b_len
-
-        return total_penalty, temp_placements
+                    finished = msg
+                    break
+        except queue.Empty:
+            pass
 
-    def save_to_blueprint(self):
-        if not os.path.exists(DONOR_BLUEPRINT):
-            messagebox.showerror("Error", f"Missing {DONOR_BLUEPRINT}")
+        if finished is None:
+            self.root.after(EXPORT_POLL_MS, self.poll_export)
             return
-        with open(DONOR_BLUEPRINT, "r") as f: bp = json.load(f)
-
-        bp["Blueprint"]["SCs"] = []; bp["Blueprint"]["BP1"] = None; bp["Blueprint"]["BP2"] = None
-        guid_map = {}; next_id = 1000
-        bp["Blueprint"]["BLP"] = []; bp["Blueprint"]["BLR"] = []; bp["Blueprint"]["BlockIds"] = []; bp["Blueprint"]["BCI"] = []
-
-        for p in self.placements:
-            pos = p['pos']
-            rot = p['rot']
-            guid = p['guid']
-
-            if guid not in guid_map: guid_map[guid] = next_id; next_id += 1
-            bp["Blueprint"]["BLP"].append(f"{int(pos[0])},{int(pos[1])},{int(pos[2])}")
-            bp["Blueprint"]["BLR"].append(int(rot))
-            bp["Blueprint"]["BlockIds"].append(int(guid_map[guid]))
-            bp["Blueprint"]["BCI"].append(0)
-
-        if "ItemDictionary" not in bp: bp["ItemDictionary"] = {}
-        for g, i in guid_map.items(): bp["ItemDictionary"][str(i)] = g
-
-        count = len(self.placements)
-        bp["Blueprint"]["BlockState"] = f"=0,{count}"
-        bp["Blueprint"]["TotalBlockCount"] = count
-        bp["Blueprint"]["AliveCount"] = count
-        bp["SavedTotalBlockCount"] = count
-
-        # --- OUTPUT LOGIC ---
-        if self.save_path:
-            out_file = os.path.join(self.save_path, OUTPUT_FILENAME)
+
+        self.export_thread = None
+        self.btn_export.config(state=tk.NORMAL)
+        self.btn_cancel.config(state=tk.DISABLED)
+        kind, payload = finished
+        if kind == "done":
+            out_file, report = payload
+            if self.spec_thread is None and self.export_key is not None:
+                # The export filled the stage memo for this design just like a background build
+                self.spec_key, self.spec_ready = self.export_key, True
+                self.update_result_status()
+            self.progress_bar["value"] = len(EXPORT_STAGES)
+            cached = " (cached)" if report and report.get("cache") == "hit" else ""
+            self.lbl_progress.config(text=f"Done in {report['wall_s']:.2f}s{cached}" if report else "Done")
+            if isinstance(out_file, dict):
+                out_file = f"{len(out_file)} blueprints in {os.path.dirname(next(iter(out_file.values())))}"
+            if out_file: messagebox.showinfo("Success", f"Generated {out_file}\n\n{format_stage_report(report)}")
+        elif kind == "cancelled":
+            self.progress_bar["value"] = 0
+            self.lbl_progress.config(text="Cancelled")
         else:
-            # Fallback to script directory if no path selected
-            out_file = os.path.join(BASE_DIR, OUTPUT_FILENAME)
-
-        with open(out_file, "w") as f: json.dump(bp, f)
-
-
-    def apply_armor_thickness(self):
-        # 1. Map the current ship state
-        # structure: map[y][z] = set of occupied X coordinates
-        layer_map = {}
-
-        for p in self.placements:
-            x, y, z = p['pos']
-            if y not in layer_map: layer_map[y] = {}
-            if z not in layer_map[y]: layer_map[y][z] = set()
-
-            # Mark occupied voxels
-            # Note: Beams/Slopes might have length > 1, but in this simplified map
-            # we only care about the anchor position for the scan,
-            # OR we need to map the full volume.
-            # Let's map the FULL volume to be safe.
-
-            length = p['props']['len']
-            is_stern = p['props'].get('is_stern', False)
-
-            # Determine Z-range of this block
-            z_start = z
-            z_end = z
-            if is_stern:
-                z_end = z # Stern builds "forward" from anchor?
-                # Actually, checking simulate_hull:
-                # Stern blocks (is_stern=True) build Z-1, Z-2...
-                # Normal blocks build Z+1, Z+2...
-                # Let's map all occupied Zs
-                for i in range(length): layer_map[y].setdefault(z - i, set()).add(x)
-            else:
-                # Normal blocks (beam or slope)
-                 for i in range(length): layer_map[y].setdefault(z + i, set()).add(x)
+            self.progress_bar["value"] = 0
+            self.lbl_progress.config(text="Failed")
+            messagebox.showerror("Error", payload)
 
-        new_armor_voxels = []
+    def cancel_export(self):
+        if self.export_cancel is not None:
+            self.export_cancel.set()
+            self.lbl_progress.config(text="Cancelling...")
 
-        # 2. Scan and Fill
-        # Iterate over every Y level
-        for y, z_row in layer_map.items():
+    def open_sweep(self):
+        if len(self.points) < 2: return
+        SweepDialog(self)
+
+
+class SweepDialog:
+    """Runs a parameter sweep over the current outline and exports only the picked rows.
+
+    Every combination is built (not saved) in a process pool by run_sweep;
+    the summary lands in the table and in a CSV next to the blueprints.
+    """
+
+    COLUMNS = (("material", "Material", 70), ("height", "Height", 55), ("undercut", "Undercut", 65),
+               ("thickness", "Armor", 50), ("blocks", "Blocks", 70), ("penalty", "Penalty", 65),
+               ("deviation", "Deviation (m)", 85), ("fallbacks", "Fallbacks", 65), ("cost", "Est. Cost", 75), ("seconds", "Time (s)", 65),
+               ("pareto", "Pareto", 55))
+
+    def __init__(self, designer):
+        self.designer = designer
+        self.root = designer.root
+        self.profile = build_profile(designer.points)
+        self.do_floor = designer.var_floor.get()
+        self.solver = SOLVER_CHOICES.get(designer.var_solver.get(), "greedy")
+        self.out_dir = designer.var_save_path.get() or BASE_DIR
+        self.rows = []
+        self.thread = None
+        self.queue = None
+        self.cancel = threading.Event()
+
+        material, materials = designer.selected_materials()
+        self.var_heights = tk.StringVar(value=str(designer.var_height.get()))
+        self.var_undercuts = tk.StringVar(value=str(designer.var_undercut.get()))
+        self.var_thicknesses = tk.StringVar(value=str(designer.var_thickness.get()))
+        self.var_materials = tk.StringVar(value=",".join(materials or [material]))
+
+        self.top = tk.Toplevel(self.root)
+        self.top.title("Parameter Sweep")
+        self.top.configure(bg=THEME_PANEL_BG)
+        self.top.protocol("WM_DELETE_WINDOW", self.close)
+
+        form = tk.Frame(self.top, bg=THEME_PANEL_BG, padx=10, pady=5)
+        form.pack(fill=tk.X)
+        fields = (("Deck Height:", self.var_heights), ("Undercut Layers:", self.var_undercuts),
+                  ("Armor Thickness:", self.var_thicknesses), ("Materials:", self.var_materials))
+        for row, (text, var) in enumerate(fields):
+            tk.Label(form, text=text, bg=THEME_PANEL_BG, fg=THEME_TEXT).grid(row=row, column=0, sticky="w")
+            tk.Entry(form, textvariable=var, bg="white", width=30).grid(row=row, column=1, sticky="w", padx=5, pady=1)
+        tk.Label(form, text='Ranges as "2-6", "2-10:2" or "1,3,5"', bg=THEME_PANEL_BG, fg="#444").grid(
+            row=len(fields), column=0, columnspan=2, sticky="w")
+
+        buttons = tk.Frame(self.top, bg=THEME_PANEL_BG, padx=10)
+        buttons.pack(fill=tk.X)
+        self.btn_run = tk.Button(buttons, text="Run Sweep", command=self.run, bg=THEME_PANEL_BG, relief=tk.RAISED, bd=2)
+        self.btn_run.pack(side=tk.LEFT, pady=5)
+        self.btn_export = tk.Button(buttons, text="Export Selected", command=self.export_selected, state=tk.DISABLED,
+                                    bg=THEME_PANEL_BG, relief=tk.RAISED, bd=2)
+        self.btn_export.pack(side=tk.LEFT, padx=5, pady=5)
+        self.lbl_status = tk.Label(buttons, text="", bg=THEME_PANEL_BG, fg="#444")
+        self.lbl_status.pack(side=tk.LEFT, padx=5)
+
+        self.tree = ttk.Treeview(self.top, columns=[c[0] for c in self.COLUMNS], show="headings",
+                                 selectmode="extended", height=16)
+        for key, heading, width in self.COLUMNS:
+            self.tree.heading(key, text=heading, command=lambda k=key: self.sort_by(k))
+            self.tree.column(key, width=width, anchor="e")
+        self.tree.tag_configure("pareto", font=("MS Sans Serif", 9, "bold"))
+        self.tree.tag_configure("error", foreground="red")
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+
+    def run(self):
+        if self.thread is not None: return
+        try:
+            cases = sweep_cases(parse_sweep_values(self.var_heights.get()), parse_sweep_values(self.var_undercuts.get()),
+                                parse_sweep_values(self.var_thicknesses.get()),
+                                parse_sweep_values(self.var_materials.get(), str))
+        except ValueError as e:
+            messagebox.showerror("Sweep", f"Invalid range: {e}", parent=self.top)
+            return
+        if not cases: return
+
+        self.queue = queue.Queue()
+        progress = lambda done, total, q=self.queue: q.put(("progress", done, total))
+        self.start(self.sweep_worker, (self.profile, cases, self.do_floor, self.solver, self.out_dir, progress,
+                                       self.cancel, self.queue), f"Building {len(cases)} combinations...")
+
+    def export_selected(self):
+        if self.thread is not None: return
+        picked = [self.rows[int(iid)] for iid in self.tree.selection() if not self.rows[int(iid)]["error"]]
+        if not picked: return
+        stem = os.path.splitext(OUTPUT_FILENAME)[0]
+        jobs = sweep_jobs(self.profile, picked, self.do_floor, self.solver, stem)
+        self.queue = queue.Queue()
+        self.start(self.export_worker, (jobs, self.out_dir, self.queue), f"Exporting {len(jobs)} blueprints...")
+
+    def start(self, worker, args, status):
+        self.thread = threading.Thread(target=worker, args=args, daemon=True)
+        self.btn_run.config(state=tk.DISABLED)
+        self.btn_export.config(state=tk.DISABLED)
+        self.lbl_status.config(text=status)
+        self.thread.start()
+        self.root.after(EXPORT_POLL_MS, self.poll)
+
+    @staticmethod
+    def sweep_worker(profile, cases, do_floor, solver, out_dir, progress, cancel, results):
+        # Runs on the worker thread: never touch Tk from here
+        try:
+            rows = run_sweep(profile, cases, do_floor, solver, os.cpu_count() or 1, progress, cancel)
+            table = os.path.join(out_dir, os.path.splitext(OUTPUT_FILENAME)[0] + ".sweep.csv")
+            write_sweep_table(rows, table)
+            results.put(("swept", (rows, table)))
+        except GenerationCancelled:
+            results.put(("cancelled", None))
+        except Exception as e:
+            results.put(("error", f"{e}"))
 
-            # Determine voxels to fill for this Y level
-            voxels_to_fill_at_y = []
+    @staticmethod
+    def export_worker(jobs, out_dir, results):
+        try:
+            done, elapsed = run_batch(jobs, out_dir, os.cpu_count() or 1)
+            results.put(("exported", (done, elapsed)))
+        except Exception as e:
+            results.put(("error", f"{e}"))
 
-            for z, x_set in z_row.items():
-                if not x_set: continue
+    def poll(self):
+        finished = None
+        try:
+            while True:
+                msg = self.queue.get_nowait()
+                if msg[0] == "progress":
+                    self.lbl_status.config(text=f"Built {msg[1]}/{msg[2]} combinations...")
+                else:
+                    finished = msg
+                    break
+        except queue.Empty:
+            pass
 
-                # Find boundaries
-                max_x = max(x_set) # Starboard side outer wall
-                min_x = min(x_set) # Port side outer wall
+        if finished is None:
+            self.root.after(EXPORT_POLL_MS, self.poll)
+            return
 
-                # Fill Starboard (Positive X) -> Inwards (Negative direction)
-                # We want to fill from (max_x - 1) down to (max_x - thickness + 1)
-                for t in range(1, self.thickness):
-                    target_x = max_x - t
-                    if target_x > 0: # Don't cross center line
-                        if target_x not in x_set:
-                            voxels_to_fill_at_y.append((target_x, z))
-                            # Temporarily mark as filled so we don't double add if logic overlaps
-                            x_set.add(target_x)
+        self.thread = None
+        if not self.top.winfo_exists(): return
+        self.btn_run.config(state=tk.NORMAL)
+        kind, payload = finished
+        if kind == "swept":
+            self.rows, table = payload
+            self.fill_table()
+            self.lbl_status.config(text=f"{len(self.rows)} combinations, table saved to {table}")
+        elif kind == "exported":
+            done, elapsed = payload
+            failed = [r for r in done if r["error"]]
+            self.lbl_status.config(text=f"Exported {len(done) - len(failed)} blueprints in {elapsed:.1f}s")
+            if failed:
+                messagebox.showerror("Sweep", "\n".join(f"{r['name']}: {r['error']}" for r in failed), parent=self.top)
+        elif kind == "cancelled":
+            self.lbl_status.config(text="Cancelled")
+        else:
+            self.lbl_status.config(text="Failed")
+            messagebox.showerror("Sweep", payload, parent=self.top)
+        if self.rows: self.btn_export.config(state=tk.NORMAL)
 
-                # Fill Port (Negative X) -> Inwards (Positive direction)
-                for t in range(1, self.thickness):
-                    target_x = min_x + t
-                    if target_x < 0: # Don't cross center line
-                        if target_x not in x_set:
-                            voxels_to_fill_at_y.append((target_x, z))
-                            x_set.add(target_x)
+    def fill_table(self):
+        self.tree.delete(*self.tree.get_children())
+        for i, r in enumerate(self.rows):
+            shown = dict(r, seconds=f"{r['seconds']:.2f}", pareto="yes" if r["pareto"] else "")
+            if r["deviation"] is not None: shown["deviation"] = f"{r['deviation']:.2f}"
+            values = [shown[key] for key, _, _ in self.COLUMNS]
+            tags = ("error",) if r["error"] else ("pareto",) if r["pareto"] else ()
+            self.tree.insert("", tk.END, iid=str(i), values=values, tags=tags)
 
-            # 3. Optimize these 1m voxels into beams for this Y level
-            if voxels_to_fill_at_y:
-                optimized = self.optimize_beams(voxels_to_fill_at_y, y)
-                new_armor_voxels.extend(optimized)
+    def sort_by(self, key):
+        # Failed rows (no penalty/deviation/cost) go last
+        def sort_key(iid):
+            value = self.rows[int(iid)][key]
+            return (value is None, value if value is not None else 0)
 
-        # 4. Add new blocks to main list
-        self.placements.extend(new_armor_voxels)
+        for pos, iid in enumerate(sorted(self.tree.get_children(), key=sort_key)):
+            self.tree.move(iid, "", pos)
 
+    def close(self):
+        self.cancel.set()
+        self.top.destroy()
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(batch_main(sys.argv[1:]))
+
     root = tk.Tk()
     app = HullDesigner(root)
     root.mainloop()
-    ###
\ No newline at end of file
+    ###
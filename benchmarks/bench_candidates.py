@@ -0,0 +1,83 @@
+"""Micro-benchmark: per-step cost of building solver candidates.
+
+Compares the old per-step candidate rebuild (sort the union of slope and
+beam lengths, build fresh dicts) with indexing the precomputed
+CandidateCatalog, over every solver step of a 2000 m profile.
+
+    bin\\python.exe benchmarks\\bench_candidates.py [--material Alloy] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hull_engine import BlueprintGenerator, build_profile
+from hulls import LONG_HULL
+
+
+def legacy_candidates(gen, current_z, forced_1m_zone, is_inner_layer):
+    # The candidate construction simulate_hull used to run on every step
+    all_lengths = sorted(list(set(list(gen.slope_guids.keys()) + list(gen.beam_guids.keys()))), reverse=True)
+    limit_len = 99
+    if current_z < forced_1m_zone: limit_len = 1
+
+    candidates = []
+    for l in all_lengths:
+        if l > limit_len: continue
+        if not is_inner_layer:
+            if l in gen.slope_guids:
+                candidates.append({"type": "slope", "len": l, "offset": -1, "is_stern": False, "guid": gen.slope_guids[l]})
+                candidates.append({"type": "slope", "len": l, "offset": 1, "is_stern": True, "guid": gen.slope_guids[l]})
+        if l in gen.beam_guids:
+            candidates.append({"type": "beam", "len": l, "offset": 0, "is_stern": False, "guid": gen.beam_guids[l]})
+    return candidates
+
+
+def best_of(repeat, fn):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--material", default="Alloy")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    profile = build_profile(LONG_HULL)
+    gen = BlueprintGenerator(profile, 0, 1, 0, False, "", args.material, 1, headless=True, solver="greedy")
+
+    # As many lookups as the greedy solver takes steps (one starboard block per step)
+    _, shell = gen.simulate_hull(0, profile)
+    steps = list(range(len(shell)))
+
+    def run_legacy():
+        for z in steps:
+            for inner in (False, True):
+                legacy_candidates(gen, z, 1, inner)
+
+    def run_catalog():
+        catalog = gen.candidates
+        for z in steps:
+            for inner in (False, True):
+                catalog.select(inner, z < 1)
+
+    n = len(steps) * 2
+    t_legacy = best_of(args.repeat, run_legacy)
+    t_catalog = best_of(args.repeat, run_catalog)
+    t_solve = best_of(args.repeat, lambda: gen.simulate_hull(0, profile))
+
+    print(f"Profile: {len(profile)} m, material {args.material}, {len(gen.candidates)} candidates")
+    print(f"Legacy rebuild : {t_legacy / n * 1e6:8.2f} us/step")
+    print(f"Catalog lookup : {t_catalog / n * 1e6:8.2f} us/step  ({t_legacy / max(t_catalog, 1e-12):.0f}x faster)")
+    print(f"Greedy solve   : {t_solve * 1000:8.2f} ms total, {len(shell)} steps")
+
+
+if __name__ == "__main__":
+    main()
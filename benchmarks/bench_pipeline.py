@@ -0,0 +1,140 @@
+"""Pipeline benchmark: per-stage time, memory and block counts over a hull matrix.
+
+Runs BlueprintGenerator headlessly over synthetic profiles (the GUI presets,
+500/1000/2000 m hulls, steep bows that force solver fallbacks, jagged
+outlines) crossed with a few height/undercut/thickness/material settings.
+Results are written as JSON; with --baseline they are compared case by case
+and the exit code is 1 when any stage got slower than the threshold allows.
+
+    bin\\python.exe benchmarks\\bench_pipeline.py [--repeat 3] [--filter long] [--output results.json]
+    bin\\python.exe benchmarks\\bench_pipeline.py --baseline benchmarks\\baseline.json [--threshold 0.2]
+    bin\\python.exe benchmarks\\bench_pipeline.py --output benchmarks\\baseline.json   (store a new baseline)
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from hull_engine import BlueprintGenerator, PRESET_HULLS, build_profile
+from hulls import long_hull
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HERE, "results.json")
+MIN_REGRESSION_S = 0.002 # Differences below this are timer noise, whatever the ratio
+
+
+def jagged_hull(length, step=10):
+    # Width zig-zags every step meters, so nearly every segment needs a slope
+    return [(0, 0)] + [(z, 8 + 4 * (i % 2)) for i, z in enumerate(range(step, length + 1, step))]
+
+
+PROFILES = {
+    "preset100": PRESET_HULLS["100m"],
+    "preset200": PRESET_HULLS["200m"],
+    "long500": long_hull(500),
+    "long1000": long_hull(1000),
+    "long2000": long_hull(2000),
+    "steep": [(0, 0), (1, 8), (3, 14), (300, 14)], # Bow blunter than 45 degrees
+    "jagged": jagged_hull(300),
+}
+
+CONFIGS = {
+    "default": {"height": 3, "undercut": 5, "floor": True, "thickness": 2, "material": "Alloy"},
+    "heavy": {"height": 8, "undercut": 8, "floor": True, "thickness": 5, "material": "Metal"},
+    "flat": {"height": 1, "undercut": 0, "floor": False, "thickness": 1, "material": "Wood"},
+}
+
+
+def run_case(points, config, solver, out_dir, trace_memory=False):
+    generator = BlueprintGenerator(build_profile(points), 0, config["height"], config["undercut"], config["floor"],
+                                   out_dir, config["material"], config["thickness"], headless=True,
+                                   solver=solver, trace_memory=trace_memory)
+    generator.generate()
+    return generator.report
+
+
+def bench_case(points, config, solver, repeat, memory):
+    """Best-of-repeat stage times, plus one traced run for memory peaks."""
+    with tempfile.TemporaryDirectory() as out_dir:
+        reports = [run_case(points, config, solver, out_dir) for _ in range(repeat)]
+        traced = run_case(points, config, solver, out_dir, trace_memory=True) if memory else None
+
+    stages = {}
+    for i, st in enumerate(reports[0]["stages"]):
+        runs = [r["stages"][i] for r in reports]
+        stages[st["stage"]] = {"wall_s": min(r["wall_s"] for r in runs),
+                               "cpu_s": min(r["cpu_s"] for r in runs),
+                               "peak_bytes": traced["stages"][i]["peak_bytes"] if traced else None,
+                               "blocks_out": st["blocks_out"]}
+    return {"total_s": min(r["wall_s"] for r in reports),
+            "blocks": reports[0]["blocks"],
+            "solver_fallbacks": reports[0]["solver_fallbacks"],
+            "stages": stages}
+
+
+def compare(results, baseline, threshold):
+    """Returns (regressions, notes) between two results files' cases."""
+    regressions, notes = [], []
+    for case, new in results["cases"].items():
+        old = baseline["cases"].get(case)
+        if old is None:
+            notes.append(f"{case}: not in baseline")
+            continue
+        if new["blocks"] != old["blocks"]:
+            notes.append(f"{case}: block count {old['blocks']} -> {new['blocks']}")
+        timings = [("total", old["total_s"], new["total_s"])]
+        timings += [(stage, old["stages"][stage]["wall_s"], st["wall_s"])
+                    for stage, st in new["stages"].items() if stage in old["stages"]]
+        for stage, before, after in timings:
+            if after > before * (1 + threshold) and after - before > MIN_REGRESSION_S:
+                regressions.append(f"{case} [{stage}]: {before * 1000:.1f} ms -> {after * 1000:.1f} ms "
+                                   f"(+{(after / max(before, 1e-9) - 1) * 100:.0f}%)")
+    return regressions, notes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest counts")
+    parser.add_argument("--solver", default="greedy", choices=("greedy", "dp"))
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced run that measures memory peaks")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Results file to write")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown per stage (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = {"meta": {"python": platform.python_version(), "numpy": np.__version__,
+                        "machine": platform.platform(), "solver": args.solver, "repeat": args.repeat},
+               "cases": {}}
+    for profile_name, points in PROFILES.items():
+        for config_name, config in CONFIGS.items():
+            case = f"{profile_name}/{config_name}"
+            if args.filter not in case: continue
+            res = bench_case(points, config, args.solver, args.repeat, not args.no_memory)
+            results["cases"][case] = res
+            peak = "      -" if args.no_memory else f"{max(st['peak_bytes'] for st in res['stages'].values()) / 1e6:7.1f}"
+            print(f"{case:<20}{res['total_s'] * 1000:9.1f} ms {res['blocks']:>8} blocks "
+                  f"{peak} MB peak  {res['solver_fallbacks']} fallbacks")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if not args.baseline: return 0
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions, notes = compare(results, baseline, args.threshold)
+    for note in notes: print(f"note: {note}")
+    for reg in regressions: print(f"REGRESSION: {reg}")
+    print(f"{len(regressions)} regression(s) beyond {args.threshold * 100:.0f}% against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Incremental re-solve check: cached solver state against solving from scratch.
+
+Replays random outline edits (append a point, drop the last one, nudge a
+width) the way the designer does while drawing, solving each outline once
+through a shared solver_cache and once without it. Every incremental solve
+must match the scratch one exactly (penalty, placements, fallbacks); the
+timings show what the cache saves on appends and on a 2000 m hull. Exits
+with 1 on any mismatch.
+
+    bin\\python.exe benchmarks\\bench_resolve.py [--edits 120] [--seed 5] [--material Alloy]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hull_engine import BlueprintGenerator, build_profile
+from hulls import LONG_HULL
+
+SOLVERS = ("greedy", "dp")
+
+
+def timed_solve(profile, solver, material, cache):
+    gen = BlueprintGenerator(profile, 0, 1, 0, False, "", material, 1, headless=True, solver=solver,
+                             solver_cache=cache)
+    start = time.perf_counter()
+    penalty, shell = gen.solve_shell(0, profile)
+    return time.perf_counter() - start, (penalty, shell.array.tobytes(), gen.solver_fallbacks)
+
+
+def edit(points, rng):
+    # Returns True for appends, the edit the cache is built for
+    r = rng.random()
+    if r < 0.5 or len(points) < 3:
+        points.append((points[-1][0] + rng.randint(1, 60), max(0, points[-1][1] + rng.randint(-3, 3))))
+        return True
+    if r < 0.8:
+        points.pop()
+    else:
+        i = rng.randrange(1, len(points))
+        points[i] = (points[i][0], max(0, points[i][1] + rng.choice((-1, 1))))
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--edits", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--material", default="Alloy")
+    args = parser.parse_args()
+
+    mismatches = 0
+    for solver in SOLVERS:
+        rng = random.Random(args.seed)
+        cache = {}
+        points = [(0, 0), (5, 4), (30, 12)]
+        worst_inc = worst_full = 0.0
+        for i in range(args.edits):
+            appended = edit(points, rng)
+            profile = build_profile(points)
+            t_inc, inc = timed_solve(profile, solver, args.material, cache)
+            t_full, full = timed_solve(profile, solver, args.material, None)
+            if inc != full:
+                mismatches += 1
+                print(f"MISMATCH: {solver} edit {i} ({len(profile)} m)")
+            if appended:
+                worst_inc = max(worst_inc, t_inc)
+                worst_full = max(worst_full, t_full)
+        print(f"{solver:<7} {args.edits} edits: worst append {worst_inc * 1000:.2f} ms incremental, "
+              f"{worst_full * 1000:.2f} ms from scratch")
+
+    for solver in SOLVERS:
+        cache = {}
+        points = list(LONG_HULL)
+        timed_solve(build_profile(points), solver, args.material, cache)
+        points.append((points[-1][0] + 10, points[-1][1] - 2))
+        profile = build_profile(points)
+        t_inc, inc = timed_solve(profile, solver, args.material, cache)
+        t_full, full = timed_solve(profile, solver, args.material, None)
+        if inc != full:
+            mismatches += 1
+            print(f"MISMATCH: {solver} 2000 m append")
+        print(f"{solver:<7} 2000 m append: {t_inc * 1000:.2f} ms incremental, {t_full * 1000:.2f} ms from scratch")
+
+    print(f"{mismatches} mismatch(es)")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Solver comparison: blocks, fit penalty and time of the greedy and DP shell solvers.
+
+Solves the outer shell of random outlines (2-8 points, up to 300 m) with
+both solvers and counts where each one uses fewer blocks, then times them
+on a 2000 m hull. The default solver should win on blocks and speed; this
+is the check to rerun before changing it.
+
+    bin\\python.exe benchmarks\\bench_solvers.py [--outlines 300] [--seed 0] [--material Alloy] [--repeat 9]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hull_engine import BlueprintGenerator, build_profile
+from hulls import LONG_HULL
+
+SOLVERS = ("greedy", "dp")
+
+
+def random_outline(rng):
+    n = rng.randint(2, 8)
+    zs = sorted(rng.sample(range(1, 300), n - 1))
+    return [(0, 0)] + [(z, rng.randint(1, 30)) for z in zs]
+
+
+def solve(profile, solver, material):
+    gen = BlueprintGenerator(profile, 0, 1, 0, False, "", material, 1, headless=True, solver=solver)
+    penalty, shell = gen.solve_shell(0, profile)
+    return penalty, shell.block_count()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--outlines", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--material", default="Alloy")
+    parser.add_argument("--repeat", type=int, default=9, help="Timed runs per solver; the fastest counts")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    blocks = dict.fromkeys(SOLVERS, 0)
+    dp_more = dp_fewer = dp_worse_fit = 0
+    for _ in range(args.outlines):
+        profile = build_profile(random_outline(rng))
+        (g_pen, g_blocks), (d_pen, d_blocks) = (solve(profile, s, args.material) for s in SOLVERS)
+        blocks["greedy"] += g_blocks
+        blocks["dp"] += d_blocks
+        dp_more += d_blocks > g_blocks
+        dp_fewer += d_blocks < g_blocks
+        dp_worse_fit += d_pen > g_pen
+    print(f"{args.outlines} outlines: dp uses more blocks on {dp_more}, fewer on {dp_fewer}; "
+          f"worse fit penalty on {dp_worse_fit}")
+    print("total blocks: " + ", ".join(f"{s} {n}" for s, n in blocks.items()))
+
+    profile = build_profile(LONG_HULL)
+    for solver in SOLVERS:
+        gen = BlueprintGenerator(profile, 0, 1, 0, False, "", args.material, 1, headless=True, solver=solver)
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            gen.solve_shell(0, profile)
+            best = min(best, time.perf_counter() - start)
+        print(f"{solver:<7} 2000 m shell: {best * 1000:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
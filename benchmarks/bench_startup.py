@@ -0,0 +1,64 @@
+"""Startup benchmark: cost of the headless path in fresh interpreters.
+
+Measures, best of --repeat fresh processes:
+  import      `import hull_engine` (must not pull in tkinter or numpy)
+  first hull  import + generating the 100 m preset to a blueprint
+and fails (exit code 1) when a phase goes over its budget.
+
+    bin\\python.exe benchmarks\\bench_startup.py [--repeat 5] [--budget-scale 1.0]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Milliseconds on a typical desktop; --budget-scale adjusts for slower machines
+BUDGETS_MS = {"import": 25, "first hull": 300}
+
+PROBE = r"""
+import json, sys, tempfile, time
+start = time.perf_counter()
+import hull_engine
+imported = time.perf_counter()
+heavy = sorted(m for m in ("tkinter", "numpy") if m in sys.modules)
+with tempfile.TemporaryDirectory() as out_dir:
+    generator = hull_engine.BlueprintGenerator(hull_engine.build_profile(hull_engine.PRESET_HULLS["100m"]),
+                                               0, 3, 5, True, out_dir, "Alloy", 2, headless=True)
+    generator.generate()
+done = time.perf_counter()
+print(json.dumps({"import": (imported - start) * 1000, "first hull": (done - start) * 1000, "heavy": heavy}))
+"""
+
+
+def probe():
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiply every budget by this")
+    args = parser.parse_args()
+
+    runs = [probe() for _ in range(args.repeat)]
+    failed = False
+    for phase, budget in BUDGETS_MS.items():
+        best = min(r[phase] for r in runs)
+        limit = budget * args.budget_scale
+        ok = best <= limit
+        failed |= not ok
+        print(f"{phase:<11}{best:8.1f} ms  (budget {limit:.0f} ms)  {'ok' if ok else 'OVER BUDGET'}")
+
+    heavy = runs[0]["heavy"]
+    if heavy:
+        failed = True
+        print(f"import hull_engine loaded {', '.join(heavy)}; the headless import must stay Tk- and numpy-free")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Sweep check: run_sweep timing, and sane summary rows on a hull that needs solver fallbacks.
+
+Sweeps a small height/undercut/thickness grid over an outline whose blunt
+bow forces fallback steps, once per solver. Every row must build, report
+its fallbacks, and carry a finite solver penalty and deviation (a fallback
+step costs a flat 200, never inf). Exits with 1 on any bad row.
+
+    bin\\python.exe benchmarks\\bench_sweep.py [--workers 1] [--material Alloy]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hull_engine import build_profile, run_sweep, sweep_cases
+
+SOLVERS = ("greedy", "dp")
+BLUNT_BOW = [(0, 0), (1, 8), (3, 14), (300, 14)] # Widens faster than any slope, so the bow falls back
+
+
+def bad_rows(rows):
+    problems = []
+    for r in rows:
+        if r["error"]:
+            problems.append(f"{r['name']}: {r['error']}")
+        elif not r["fallbacks"]:
+            problems.append(f"{r['name']}: expected solver fallbacks, got none")
+        elif r["penalty"] is None or not math.isfinite(r["penalty"]):
+            problems.append(f"{r['name']}: penalty {r['penalty']}")
+        elif r["deviation"] is None or not math.isfinite(r["deviation"]):
+            problems.append(f"{r['name']}: deviation {r['deviation']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--material", default="Alloy")
+    args = parser.parse_args()
+
+    profile = build_profile(BLUNT_BOW)
+    cases = sweep_cases([2, 4], [0, 3], [1, 3], [args.material])
+    failures = 0
+    for solver in SOLVERS:
+        start = time.perf_counter()
+        rows = run_sweep(profile, cases, solver=solver, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        penalties = sorted({r["penalty"] for r in rows if not r["error"]})
+        print(f"{solver:<7} {len(rows)} cases in {elapsed * 1000:.0f} ms, penalty {penalties}, "
+              f"{rows[0]['fallbacks']} fallbacks")
+        for problem in bad_rows(rows):
+            failures += 1
+            print(f"BAD ROW: {solver} {problem}")
+
+    print(f"{failures} bad row(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
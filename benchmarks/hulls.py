@@ -0,0 +1,9 @@
+"""Test outlines shared by the benchmark scripts."""
+
+
+def long_hull(length):
+    # Sharp bow, long parallel midbody, tapered stern
+    return [(0, 0), (6, 6), (30, 15), (length // 10, 22), (length * 9 // 10, 22), (length * 39 // 40, 15), (length, 10)]
+
+
+LONG_HULL = long_hull(2000)
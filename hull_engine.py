@@ -0,0 +1,2178 @@
+"""Hull generation engine.
+
+Turns a hull profile into a From the Depths blueprint: asset catalog,
+shell solvers, the generation stages and the blueprint writer, plus batch
+mode. Nothing here imports tkinter, so it runs in worker processes and on
+machines without a display; errors are raised as GeneratorError.
+Generator.py is the GUI on top of it.
+
+NumPy is imported on first use (see _load_numpy), which keeps
+`import hull_engine` cheap for callers that never generate anything.
+"""
+import hashlib
+import itertools
+import json
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, namedtuple
+
+# --- LAZY NUMPY ---
+# `np` is a stand-in until the first attribute access imports numpy, rebinds
+# `np` to the real module and builds the numpy-backed constants
+# (PLACEMENT_DTYPE, ROT_MIRROR). Code below uses np exactly as if imported.
+class _LazyNumpy:
+    def __getattr__(self, name):
+        return getattr(_load_numpy(), name)
+
+
+np = _LazyNumpy()
+_NUMPY_CONSTANTS = ("PLACEMENT_DTYPE", "ROT_MIRROR")
+
+
+def _load_numpy():
+    global np, PLACEMENT_DTYPE, ROT_MIRROR
+    import numpy
+    if np is not numpy:
+        PLACEMENT_DTYPE = numpy.dtype(PLACEMENT_FIELDS)
+        # Rotation of a block's port/starboard mirror image
+        ROT_MIRROR = numpy.arange(256, dtype=numpy.uint8)
+        for left, right in ROT_MIRROR_PAIRS:
+            ROT_MIRROR[left], ROT_MIRROR[right] = right, left
+        np = numpy
+    return numpy
+
+
+def __getattr__(name):
+    # `from hull_engine import PLACEMENT_DTYPE` before anything touched numpy
+    if name in _NUMPY_CONSTANTS:
+        _load_numpy()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# --- PATH SETUP ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- CONFIGURATION ---
+DONOR_BLUEPRINT = os.path.join(BASE_DIR, "donor.blueprint")
+GUIDMAP_FILES = ["guidmap.json"]
+ASSET_CATALOG_CACHE = os.path.join(BASE_DIR, "guidmap.catalog")
+ASSET_CATALOG_VERSION = 1
+
+OUTPUT_FILENAME = "generated_hull.blueprint"
+
+RESULT_CACHE_DIR = os.path.join(BASE_DIR, "hull_cache")
+RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+RESULT_CACHE_VERSION = 3 # Bump whenever generation output changes for the same inputs
+
+MATERIALS = ("Alloy", "Metal", "Wood", "Heavy", "Stone")
+
+# Rough in-game resource cost per metre of block, only used to compare sweep results
+MATERIAL_COST = {"Alloy": 3, "Metal": 4, "Wood": 1, "Heavy": 12, "Stone": 1}
+
+# Outline points (length, half-width) behind the "Load Preset" buttons
+PRESET_HULLS = {
+    "100m": [
+        (0, 0),   # Tip (1m Beam)
+        (4, 2),   # User Point 1
+        (14, 4),  # User Point 2
+        (39, 6),  # User Point 3
+        (69, 6),  # User Point 4
+        (85, 5),  # User Point 5
+        (100, 3)  # User Point 6
+    ],
+    "200m": [
+        (0, 0),   # Tip (1m Beam)
+        (4, 4),   # User Point 1
+        (20, 9),  # User Point 2
+        (50, 14),  # User Point 3
+        (80, 17),  # User Point 4
+        (140, 17),  # User Point 5
+        (170, 15),  # User Point 6
+        (190, 11),  # User Point 7
+        (200, 7)  # User Point 8
+    ],
+}
+
+# --- ROTATION SETTINGS ---
+ROT_BEAM      = 0
+ROT_LEFT_IN   = 19
+ROT_RIGHT_IN  = 17
+ROT_LEFT_OUT  = 18
+ROT_RIGHT_OUT = 16
+ROT_LEFT_STERN  = 19
+ROT_RIGHT_STERN = 17
+
+
+def build_profile(points):
+    # Interpolate the drawn outline into one half-width value per meter of length
+    max_z = points[-1][0]
+    z_coords = [p[0] for p in points]
+    x_coords = [p[1] for p in points]
+    full_z = np.arange(max_z + 1)
+    full_x = np.interp(full_z, z_coords, x_coords)
+    return np.round(full_x).astype(int)
+
+
+class GeneratorError(Exception):
+    pass
+
+
+class GenerationCancelled(GeneratorError):
+    pass
+
+
+def format_stage_report(report):
+    """One line per stage plus a total, for showing a generate() report to the user."""
+    lines = []
+    for st in report["stages"]:
+        peak = f"{st['peak_bytes'] / 1e6:7.1f} MB" if st["peak_bytes"] is not None else "      - MB"
+        reused = "  reused" if st.get("memoized") else ""
+        lines.append(f"{st['stage']:<9}{st['wall_s'] * 1000:9.1f} ms{peak}  {st['blocks_in']:>8} -> {st['blocks_out']:<8}{reused}")
+    lines.append(f"Total {report['wall_s'] * 1000:.1f} ms, {report['blocks']} blocks, {report['solver_fallbacks']} solver fallbacks")
+    return "\n".join(lines)
+
+
+# Progress stages reported by BlueprintGenerator.generate, in order
+EXPORT_STAGES = ("solver", "stern", "stacking", "undercut", "floor", "armor", "save")
+
+
+# --- PLACEMENT STORAGE ---
+# One row per placed block. The block type is an index into a GuidTable,
+# so the GUID strings are stored once per hull instead of once per block.
+FLAG_STERN = 1 # Slope/offset runs backwards from its anchor (Z-1, Z-2...)
+FLAG_SLOPE = 2 # Slope-shaped block (slopes and the offsets hanging under them)
+FLAG_MIRROR = 4 # Starboard row whose port twin (at -x) is only materialized when saving
+
+# Rotations that swap under the port/starboard mirror (ROT_MIRROR is built from these)
+ROT_MIRROR_PAIRS = ((ROT_LEFT_IN, ROT_RIGHT_IN), (ROT_LEFT_OUT, ROT_RIGHT_OUT))
+
+# Row layout; PLACEMENT_DTYPE is built from this when numpy loads
+PLACEMENT_FIELDS = [
+    ("x", "<i2"), ("y", "<i2"), ("z", "<i2"),
+    ("rot", "u1"),
+    ("type", "<u2"),
+    ("len", "u1"),
+    ("flags", "u1"),
+]
+
+
+class GuidTable:
+    """Interns block GUIDs into small integer block-type indices."""
+
+    def __init__(self, guids=()):
+        self.guids = []
+        self._index = {}
+        for guid in guids: self.index(guid)
+
+    def index(self, guid):
+        idx = self._index.get(guid)
+        if idx is None:
+            idx = len(self.guids)
+            self.guids.append(guid)
+            self._index[guid] = idx
+        return idx
+
+    def __getitem__(self, idx):
+        return self.guids[idx]
+
+    def __len__(self):
+        return len(self.guids)
+
+
+def make_placements(x, y, z, rot, block_type, length, flags=0):
+    """Builds a placement array from per-column values (scalars broadcast)."""
+    cols = np.broadcast_arrays(*(np.asarray(c) for c in (x, y, z, rot, block_type, length, flags)))
+    out = np.empty(cols[0].size, dtype=PLACEMENT_DTYPE)
+    for name, col in zip(PLACEMENT_DTYPE.names, cols):
+        out[name] = col.ravel()
+    return out
+
+
+def block_cells(rows):
+    """Expands placement rows into the (x, y, z) cells they cover, as int64 arrays.
+
+    Blocks run +z from their anchor, stern blocks run -z.
+    """
+    length = rows["len"].astype(np.int64)
+    owner = np.repeat(np.arange(len(rows)), length)
+    step = np.arange(len(owner)) - np.repeat(np.cumsum(length) - length, length)
+    step = np.where(rows["flags"][owner] & FLAG_STERN, -step, step)
+    return (rows["x"][owner].astype(np.int64), rows["y"][owner].astype(np.int64),
+            rows["z"][owner].astype(np.int64) + step)
+
+
+def mirror_rows(rows, mirror_types=None):
+    """Expands FLAG_MIRROR rows into port/starboard pairs, port twin first.
+
+    Twins get -x, the mirrored rotation and, through mirror_types (an array
+    indexed by block type), the opposite-handed block type.
+    """
+    mirrored = (rows["flags"] & FLAG_MIRROR) != 0
+    if not mirrored.any(): return rows
+    copies = 1 + mirrored.astype(np.int64)
+    out = np.repeat(rows, copies)
+    twin = out[(np.cumsum(copies) - copies)[mirrored]]
+    twin["x"] = -twin["x"]
+    twin["rot"] = ROT_MIRROR[twin["rot"]]
+    if mirror_types is not None: twin["type"] = mirror_types[twin["type"]]
+    out[(np.cumsum(copies) - copies)[mirrored]] = twin
+    out["flags"] &= np.uint8(~FLAG_MIRROR & 0xFF)
+    return out
+
+
+class PlacementStore:
+    """Growable structured-array list of block placements sharing one GuidTable."""
+
+    def __init__(self, guid_table=None, data=None):
+        self.guid_table = guid_table if guid_table is not None else GuidTable()
+        if data is None:
+            self._data = np.empty(64, dtype=PLACEMENT_DTYPE)
+            self._size = 0
+        else:
+            self._data = np.ascontiguousarray(data, dtype=PLACEMENT_DTYPE)
+            self._size = len(self._data)
+
+    @property
+    def array(self):
+        """The live rows as a structured array view (do not hold across appends)."""
+        return self._data[:self._size]
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed <= len(self._data): return
+        capacity = max(needed, len(self._data) * 2)
+        grown = np.empty(capacity, dtype=PLACEMENT_DTYPE)
+        grown[:self._size] = self._data[:self._size]
+        self._data = grown
+
+    def append(self, pos, rot, guid, length, flags=0):
+        self._reserve(1)
+        self._data[self._size] = (pos[0], pos[1], pos[2], rot, self.guid_table.index(guid), length, flags)
+        self._size += 1
+
+    def append_row(self, x, y, z, rot, block_type, length, flags=0):
+        # Like append(), for callers that already hold a block-type index
+        self._reserve(1)
+        self._data[self._size] = (x, y, z, rot, block_type, length, flags)
+        self._size += 1
+
+    def extend(self, rows):
+        """Bulk-appends a PlacementStore or a PLACEMENT_DTYPE array."""
+        if isinstance(rows, PlacementStore):
+            src = rows.array
+            if rows.guid_table is not self.guid_table and len(src):
+                # Re-intern the other store's block types into our table
+                remap = np.array([self.guid_table.index(g) for g in rows.guid_table.guids], dtype=np.uint16)
+                src = src.copy()
+                src["type"] = remap[src["type"]]
+            rows = src
+        n = len(rows)
+        if not n: return
+        self._reserve(n)
+        self._data[self._size:self._size + n] = rows
+        self._size += n
+
+    def clear(self):
+        self._size = 0
+
+    def copy(self):
+        return PlacementStore(self.guid_table, self.array.copy())
+
+    def layer(self, y):
+        """Placements whose anchor sits on deck level y, as a new store."""
+        rows = self.array
+        return PlacementStore(self.guid_table, rows[rows["y"] == y])
+
+    def min_y(self):
+        return int(self.array["y"].min())
+
+    def iter_chunks(self, size):
+        rows = self.array
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+
+    def iter_blocks(self, size, mirror_types=None):
+        """iter_chunks with FLAG_MIRROR rows expanded into both halves (see mirror_rows)."""
+        for chunk in self.iter_chunks(size):
+            yield mirror_rows(chunk, mirror_types)
+
+    def block_count(self):
+        """Blocks in the finished ship, counting the port twin of every FLAG_MIRROR row."""
+        return self._size + int(np.count_nonzero(self.array["flags"] & FLAG_MIRROR))
+
+    def guid_column(self):
+        return [self.guid_table.guids[t] for t in self.array["type"].tolist()]
+
+    def __iter__(self):
+        # Yields (pos, rot, guid, length, flags) per block
+        guids = self.guid_table.guids
+        for x, y, z, rot, t, length, flags in self.array.tolist():
+            yield (x, y, z), rot, guids[t], length, flags
+
+
+class StackedPlacements:
+    """Read-only PlacementStore stand-in for a base layer extruded `height` decks down.
+
+    Deck layers are built one at a time as they are read (top first, the
+    same row order stack_layers() produces), so a tall hull that is only
+    ever streamed to the writer never holds every layer in memory.
+    """
+
+    def __init__(self, base, height):
+        self.base = base
+        self.height = height
+        self.guid_table = base.guid_table
+
+    def __len__(self):
+        return len(self.base) * self.height
+
+    def layers(self):
+        base_layer = self.base.array
+        for h in range(self.height):
+            layer = base_layer.copy()
+            layer["y"] -= h
+            yield layer
+
+    @property
+    def array(self):
+        """Every row at once; materializes the whole stack, so only for callers that need it."""
+        return np.concatenate(list(self.layers())) if self.height else self.base.array[:0]
+
+    def iter_chunks(self, size):
+        for layer in self.layers():
+            for start in range(0, len(layer), size):
+                yield layer[start:start + size]
+
+    def iter_blocks(self, size, mirror_types=None):
+        for chunk in self.iter_chunks(size):
+            yield mirror_rows(chunk, mirror_types)
+
+    def block_count(self):
+        return self.base.block_count() * self.height
+
+
+
+class HullVolume:
+    """Dense (x, y, z) grid recording which placement row owns each cell.
+
+    Cells hold row index + 1 (0 = empty), so occupancy tests are a single
+    lookup. The grid grows to fit whatever is marked, and upgrades from
+    uint16 to uint32 once a hull passes 65534 blocks.
+    """
+
+    GROW_PAD = 8 # Spare cells added on each side that has to grow
+
+    def __init__(self):
+        self.origin = np.zeros(3, dtype=np.int64) # World (x, y, z) of grid[0, 0, 0]
+        self.grid = np.zeros((0, 0, 0), dtype=np.uint16)
+
+    def _fit(self, lo, hi, max_owner):
+        shape = np.array(self.grid.shape, dtype=np.int64)
+        if self.grid.size:
+            old_lo, old_hi = self.origin, self.origin + shape - 1
+            grow_lo, grow_hi = lo < old_lo, hi > old_hi
+            lo = np.where(grow_lo, lo - self.GROW_PAD, old_lo)
+            hi = np.where(grow_hi, hi + self.GROW_PAD, old_hi)
+        dtype = self.grid.dtype if max_owner < np.iinfo(self.grid.dtype).max else np.uint32
+        if self.grid.size and not (grow_lo.any() or grow_hi.any()) and dtype == self.grid.dtype: return
+
+        grid = np.zeros(tuple(hi - lo + 1), dtype=dtype)
+        if self.grid.size:
+            at = self.origin - lo
+            grid[at[0]:at[0] + shape[0], at[1]:at[1] + shape[1], at[2]:at[2] + shape[2]] = self.grid
+        self.grid, self.origin = grid, lo
+
+    def _local(self, xs, ys, zs):
+        return (np.asarray(xs, dtype=np.int64) - self.origin[0], np.asarray(ys, dtype=np.int64) - self.origin[1],
+                np.asarray(zs, dtype=np.int64) - self.origin[2])
+
+    def mark(self, rows, first_row):
+        """Marks the cells covered by rows, which are placement rows first_row, first_row + 1, ..."""
+        if not len(rows): return
+        xs, ys, zs = block_cells(rows)
+        owners = np.repeat(np.arange(first_row + 1, first_row + 1 + len(rows)), rows["len"].astype(np.int64))
+        self._fit(np.array([xs.min(), ys.min(), zs.min()]), np.array([xs.max(), ys.max(), zs.max()]), owners[-1])
+        self.grid[self._local(xs, ys, zs)] = owners
+
+    def clear(self, rows):
+        """Empties the cells covered by rows."""
+        if not len(rows) or not self.grid.size: return
+        lx, ly, lz = self._local(*block_cells(rows))
+        inside = self._inside(lx, ly, lz)
+        self.grid[lx[inside], ly[inside], lz[inside]] = 0
+
+    def _inside(self, lx, ly, lz):
+        nx, ny, nz = self.grid.shape
+        return (lx >= 0) & (lx < nx) & (ly >= 0) & (ly < ny) & (lz >= 0) & (lz < nz)
+
+    def occupied(self, xs, ys, zs):
+        """Vectorized occupancy test; cells outside the grid are empty."""
+        lx, ly, lz = self._local(xs, ys, zs)
+        lx, ly, lz = np.broadcast_arrays(lx, ly, lz)
+        inside = self._inside(lx, ly, lz)
+        hit = np.zeros(lx.shape, dtype=bool)
+        hit[inside] = self.grid[lx[inside], ly[inside], lz[inside]] != 0
+        return hit
+
+    def owner(self, x, y, z):
+        """Placement row index covering one cell, or -1."""
+        lx, ly, lz = (int(v) for v in self._local(x, y, z))
+        if not self._inside(lx, ly, lz): return -1
+        return int(self.grid[lx, ly, lz]) - 1
+
+    def levels(self):
+        """World y of every layer holding at least one block, ascending."""
+        if not self.grid.size: return []
+        return (np.flatnonzero(self.grid.any(axis=(0, 2))) + self.origin[1]).tolist()
+
+    def layer(self, y):
+        """Owner grid of one y level as an (x, z) view, starting at origin x/z."""
+        ly = y - self.origin[1]
+        if not 0 <= ly < self.grid.shape[1]: return np.zeros((self.grid.shape[0], self.grid.shape[2]), dtype=self.grid.dtype)
+        return self.grid[:, ly, :]
+
+    def copy(self):
+        volume = HullVolume()
+        volume.origin = self.origin.copy()
+        volume.grid = self.grid.copy()
+        return volume
+
+
+# --- ASSET CATALOG ---
+def classify_assets(loaded_data, target_mat):
+    """Picks one material's beams, slopes and offsets out of the raw GUID map."""
+    beam_guids = {}
+    slope_guids = {}
+    offset_guids = {}
+    transitions = {}
+    corners = {}
+
+    for name, guid in loaded_data.items():
+        name_lower = name.lower()
+
+        # --- 1m Block Logic (from standard blocks in guidmap-blocks.json) ---
+        # These usually do NOT have "1m" in the name in the json file provided
+        is_1m = False
+
+        if target_mat == "alloy":
+            if "light-weight alloy block" in name_lower: is_1m = True
+        elif target_mat == "heavy":
+            if name_lower == "heavy armour": is_1m = True
+        else:
+            # Wood, Metal, Stone follow "{Material} Block" pattern
+            if f"{target_mat} block" in name_lower: is_1m = True
+
+        if is_1m:
+            beam_guids[1] = guid
+            continue
+
+        # --- 2m, 3m, 4m and Slope/Corner Logic ---
+        # Filter for material presence in name
+        check_str = "heavy armour" if target_mat == "heavy" else target_mat
+        if check_str not in name_lower: continue
+
+        length = 0
+        if "4m" in name_lower: length = 4
+        elif "3m" in name_lower: length = 3
+        elif "2m" in name_lower: length = 2
+        elif "1m" in name_lower: length = 1 # Handle explicit "1m" in slopes/corners
+
+        if length == 0: continue
+
+        # Categorize
+        # 1. Beams (Exclude slopes/corners)
+        if "beam" in name_lower and "slope" not in name_lower and "corner" not in name_lower:
+            beam_guids[length] = guid
+
+        # 2. Slopes
+        elif "slope" in name_lower:
+            slope_guids[length] = guid
+
+        # 3. Offsets/Corners
+        elif "offset" in name_lower and "inverted" not in name_lower:
+            if length not in offset_guids:
+                offset_guids[length] = {"left": None, "right": None}
+
+            if "left" in name_lower:
+                offset_guids[length]["left"] = guid
+            elif "right" in name_lower:
+                offset_guids[length]["right"] = guid
+
+    # Transitions and corners are not placed yet, but are indexed for the catalog
+    check_str = "heavy armour" if target_mat == "heavy" else target_mat
+    for name, guid in loaded_data.items():
+        name_lower = name.lower()
+        if check_str not in name_lower: continue
+        side = "left" if ("left" in name_lower or "(l " in name_lower) else "right" if ("right" in name_lower or "(r " in name_lower) else None
+
+        match = re.search(r"(\d)m to (\d)m (slope|inverse) transition", name_lower)
+        if match and side:
+            key = (int(match.group(1)), int(match.group(2)), match.group(3))
+            transitions.setdefault(key, {"left": None, "right": None})[side] = guid
+            continue
+
+        match = re.search(r"(square backed|square|triangle) corner", name_lower)
+        length = re.search(r"(\d)m", name_lower)
+        if match and length and side:
+            key = (match.group(1), int(length.group(1)))
+            corners.setdefault(key, {"left": None, "right": None})[side] = guid
+
+    return {"beam": beam_guids, "slope": slope_guids, "offset": offset_guids,
+            "transition": transitions, "corner": corners}
+
+
+def read_guidmaps():
+    # Load from all JSON files in the BASE_DIR
+    loaded_data = {}
+    for fname in GUIDMAP_FILES:
+        fpath = os.path.join(BASE_DIR, fname)
+        if os.path.exists(fpath):
+            try:
+                with open(fpath, 'r') as f:
+                    data = json.load(f)
+                    loaded_data.update(data)
+            except Exception as e:
+                print(f"Error loading {fname}: {e}")
+    return loaded_data
+
+
+def guidmap_signature():
+    # Cache key: (name, mtime, size) of every GUID map plus the catalog format version
+    sig = [ASSET_CATALOG_VERSION]
+    for fname in GUIDMAP_FILES:
+        try:
+            st = os.stat(os.path.join(BASE_DIR, fname))
+            sig.append((fname, st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append((fname, None, None))
+    return tuple(sig)
+
+
+_asset_catalog = None
+_asset_catalog_sig = None
+
+
+def load_asset_catalog():
+    """Returns {material: classify_assets(...)} for every known material.
+
+    Compiled once from GUIDMAP_FILES and cached in memory and on disk
+    (ASSET_CATALOG_CACHE); both are invalidated when a GUID map's mtime or
+    size changes.
+    """
+    global _asset_catalog, _asset_catalog_sig
+    sig = guidmap_signature()
+    if _asset_catalog is not None and _asset_catalog_sig == sig:
+        return _asset_catalog
+
+    catalog = None
+    try:
+        with open(ASSET_CATALOG_CACHE, "rb") as f:
+            cached_sig, cached = marshal.loads(f.read())
+        if cached_sig == sig: catalog = cached
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    if catalog is None:
+        loaded_data = read_guidmaps()
+        catalog = {mat.lower(): classify_assets(loaded_data, mat.lower()) for mat in MATERIALS}
+        # Per-process temp name: batch workers starting cold may all compile and write at once
+        tmp = f"{ASSET_CATALOG_CACHE}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                marshal.dump((sig, catalog), f)
+            os.replace(tmp, ASSET_CATALOG_CACHE)
+        except OSError as e:
+            print(f"Could not write asset cache: {e}")
+            try: os.remove(tmp)
+            except OSError: pass
+
+    _asset_catalog, _asset_catalog_sig = catalog, sig
+    return catalog
+
+
+def material_assets(material):
+    """classify_assets() result for one material, from the catalog when it is a known one."""
+    assets = load_asset_catalog().get(material.lower())
+    if assets is None:
+        # Not one of the GUI materials: classify directly, uncached
+        assets = classify_assets(read_guidmaps(), material.lower())
+    return assets
+
+
+def geometry_signature(assets):
+    """The block lengths a material offers; equal signatures give identical hull geometry."""
+    return (tuple(sorted(assets["beam"])), tuple(sorted(assets["slope"])),
+            tuple(sorted(l for l, sides in assets["offset"].items() if sides["left"] and sides["right"])))
+
+
+# --- SOLVER CANDIDATES ---
+# Per-block charge solve_hull_dp() adds to break penalty ties towards fewer blocks.
+# Penalties are whole numbers and z is int16, so the charges of a whole hull stay
+# below 1 and are exact in a float.
+DP_BLOCK_TIE = 2.0 ** -16
+
+
+def first_profile_change(old, new):
+    """First z where two profiles differ; a length change counts from the shorter end."""
+    n = min(len(old), len(new))
+    diff = np.flatnonzero(np.asarray(old[:n]) != np.asarray(new[:n]))
+    return int(diff[0]) if len(diff) else n
+
+
+Candidate = namedtuple("Candidate", ["type", "len", "offset", "is_stern", "guid_index"])
+
+
+class CandidateCatalog:
+    """Immutable per-material table of shell solver candidates.
+
+    Built once when assets load. Candidates are ordered longest first, and
+    for each length: outward slope, stern slope, beam (the solver's tie-break
+    order). The subsets the solver needs are precomputed so its inner loop
+    only indexes into tuples.
+    """
+
+    def __init__(self, beam_guids, slope_guids, guid_table):
+        all_lengths = sorted(set(slope_guids) | set(beam_guids), reverse=True)
+        table = []
+        for l in all_lengths:
+            if l in slope_guids:
+                slope = guid_table.index(slope_guids[l])
+                table.append(Candidate("slope", l, -1, False, slope))
+                table.append(Candidate("slope", l, 1, True, slope))
+            if l in beam_guids:
+                table.append(Candidate("beam", l, 0, False, guid_table.index(beam_guids[l])))
+        self.table = tuple(table)
+
+        beams = tuple(c for c in self.table if c.type == "beam")
+        # Indexed by [is_inner_layer][in_forced_1m_zone]
+        self._subsets = (
+            (self.table, tuple(c for c in self.table if c.len <= 1)),
+            (beams, tuple(c for c in beams if c.len <= 1)),
+        )
+        # 1m fallbacks when nothing fits
+        outer_fb = tuple(c for c in self.table if c.len == 1)
+        self._fallbacks = (outer_fb, tuple(c for c in outer_fb if c.type == "beam"))
+
+        # Furthest profile index past z that a step at z reads (segment end or lookahead)
+        self.reach = max([max(c.len, int(c.len * 1.5)) for c in self.table] + [1])
+
+        # Placement pose per candidate: (len, z_shift, dx, rot_left, rot_right, flags, guid_index)
+        # The right-hand block sits at +(x + dx), the left-hand one at -(x + dx)
+        self.poses = {}
+        for c in self.table:
+            dx = 0
+            rot_left = rot_right = ROT_BEAM
+            flags = 0
+            if c.type == "slope":
+                flags |= FLAG_SLOPE
+                if c.is_stern:
+                    rot_left, rot_right = ROT_LEFT_STERN, ROT_RIGHT_STERN
+                elif c.offset == -1:
+                    rot_left, rot_right = ROT_LEFT_OUT, ROT_RIGHT_OUT
+                    dx = 1
+                else:
+                    rot_left, rot_right = ROT_LEFT_IN, ROT_RIGHT_IN
+            if c.is_stern: flags |= FLAG_STERN
+            z_shift = 1 if c.is_stern else c.len
+            self.poses[c] = (c.len, z_shift, dx, rot_left, rot_right, flags, c.guid_index)
+
+    def select(self, is_inner_layer, forced_1m):
+        return self._subsets[bool(is_inner_layer)][bool(forced_1m)]
+
+    def fallback_for(self, is_inner_layer):
+        return self._fallbacks[bool(is_inner_layer)]
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, idx):
+        return self.table[idx]
+
+
+# --- BLUEPRINT WRITER ---
+BLUEPRINT_CHUNK = 1 << 16 # Blocks rendered per write
+BLOCK_ARRAYS = ("BLP", "BLR", "BlockIds", "BCI") # Parallel per-block arrays in bp["Blueprint"]
+FIRST_ITEM_ID = 1000
+
+
+def _int_strings(values):
+    # str() of every value as an object array, through a table over the values' (small) range
+    values = np.asarray(values, dtype=np.int64)
+    lo = int(values.min())
+    table = np.array([str(i) for i in range(lo, int(values.max()) + 1)], dtype=object)
+    return table[values - lo]
+
+
+def _render_block_array(key, rows, type_to_id):
+    if key == "BLP":
+        cells = _int_strings(rows["x"]) + "," + _int_strings(rows["y"]) + "," + _int_strings(rows["z"])
+        return '"' + '", "'.join(cells.tolist()) + '"'
+    if key == "BLR":
+        return ", ".join(_int_strings(rows["rot"]).tolist())
+    if key == "BlockIds":
+        return ", ".join(_int_strings(type_to_id[rows["type"]]).tolist())
+    return ", ".join(["0"] * len(rows)) # BCI: default colour
+
+
+# Fields rewritten per export: (parent key or None for top level, key)
+DONOR_SPLICES = (
+    (None, "ItemDictionary"), (None, "SavedTotalBlockCount"),
+    ("Blueprint", "BLP"), ("Blueprint", "BLR"), ("Blueprint", "BCI"),
+    ("Blueprint", "TotalBlockCount"), ("Blueprint", "MaxCords"), ("Blueprint", "MinCords"),
+    ("Blueprint", "BlockIds"), ("Blueprint", "BlockState"), ("Blueprint", "AliveCount"),
+)
+
+
+class DonorTemplate:
+    """donor.blueprint pre-rendered as literal JSON around per-export splice points.
+
+    The donor is parsed and serialized once; an export then only writes the
+    cached fragments plus the values of the DONOR_SPLICES fields.
+    """
+
+    def __init__(self, path):
+        with open(path, "r") as f: bp = json.load(f)
+        bp["Blueprint"]["SCs"] = []; bp["Blueprint"]["BP1"] = None; bp["Blueprint"]["BP2"] = None
+        if "ItemDictionary" not in bp: bp["ItemDictionary"] = {}
+
+        self.item_dictionary = dict(bp["ItemDictionary"])
+        self.defaults = {} # Donor's own rendered value per splice, used when an export has none
+        markers = {}
+        for parent, key in DONOR_SPLICES:
+            target = bp if parent is None else bp[parent]
+            self.defaults[key] = json.dumps(target.get(key))
+            target[key] = f"\x00splice:{key}\x00"
+            markers[json.dumps(target[key])] = key
+
+        skeleton = json.dumps(bp)
+        self.digest = hashlib.sha256(skeleton.encode()).hexdigest() # Everything the donor contributes to an export
+        found = sorted((skeleton.index(m), m) for m in markers)
+        self.fragments = [] # [(literal JSON, splice key)], then self.tail
+        pos = 0
+        for at, marker in found:
+            self.fragments.append((skeleton[pos:at], markers[marker]))
+            pos = at + len(marker)
+        self.tail = skeleton[pos:]
+
+    def write(self, f, values):
+        # values: splice key -> rendered JSON string, or callable(f) that writes it
+        for literal, key in self.fragments:
+            f.write(literal)
+            value = values.get(key, self.defaults[key])
+            if callable(value): value(f)
+            else: f.write(value)
+        f.write(self.tail)
+
+
+_donor_template = None
+_donor_template_sig = None
+
+
+def load_donor_template():
+    """Parsed donor, cached per process and refreshed when the file's mtime or size changes."""
+    global _donor_template, _donor_template_sig
+    st = os.stat(DONOR_BLUEPRINT)
+    sig = (DONOR_BLUEPRINT, st.st_mtime_ns, st.st_size)
+    if _donor_template is None or _donor_template_sig != sig:
+        _donor_template = DonorTemplate(DONOR_BLUEPRINT)
+        _donor_template_sig = sig
+    return _donor_template
+
+
+# --- RESULT CACHE ---
+class ResultCache:
+    """Finished blueprints stored under a hash of everything that determines them.
+
+    Entries are <key>.blueprint plus <key>.report.json in one directory. A
+    hit is a file copy; entries are touched on every hit and the least
+    recently used ones are evicted once the directory outgrows max_bytes.
+    Writes go through a temp file and os.replace, so batch workers in other
+    processes can share the directory.
+    """
+
+    def __init__(self, path=RESULT_CACHE_DIR, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(profile, params, assets, template):
+        h = hashlib.sha256()
+        h.update(repr((RESULT_CACHE_VERSION, sorted(params.items()))).encode())
+        h.update(np.ascontiguousarray(profile, dtype=np.int64).tobytes())
+        h.update(marshal.dumps(assets))
+        h.update(template.digest.encode())
+        return h.hexdigest()
+
+    def entry(self, key):
+        return os.path.join(self.path, key + ".blueprint"), os.path.join(self.path, key + ".report.json")
+
+    def fetch(self, key, out_file):
+        """Copies a cached blueprint to out_file and returns its stored report, or None on a miss."""
+        import shutil # Deferred: only cached exports need it
+        blueprint, report = self.entry(key)
+        try:
+            with open(report, "r") as f:
+                stored = json.load(f)
+            shutil.copyfile(blueprint, out_file)
+            os.utime(blueprint)
+        except (OSError, ValueError):
+            return None
+        return stored
+
+    def store(self, key, out_file, report):
+        import shutil
+        os.makedirs(self.path, exist_ok=True)
+        blueprint, report_path = self.entry(key)
+        tmp = f"{blueprint}.{os.getpid()}.tmp"
+        shutil.copyfile(out_file, tmp)
+        os.replace(tmp, blueprint)
+        with open(f"{report_path}.{os.getpid()}.tmp", "w") as f:
+            json.dump(report, f)
+        os.replace(f"{report_path}.{os.getpid()}.tmp", report_path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.path) as it:
+                for e in it:
+                    if not e.name.endswith(".blueprint"): continue
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+                    total += st.st_size
+        except OSError:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes: break
+            for f in (path, path[:-len(".blueprint")] + ".report.json"):
+                try: os.remove(f)
+                except OSError: pass # Another process got there first
+            total -= size
+
+
+# --- STAGE GRAPH ---
+# BlueprintGenerator.build_hull runs these in order. Each stage only appends
+# to the placements/volume of the one before it, so its output is fully
+# determined by the stage above plus its own inputs: the generator
+# attributes it reads directly. "when" skips a stage for these settings.
+Stage = namedtuple("Stage", ["name", "method", "inputs", "when"])
+
+PIPELINE = (
+    Stage("solver", "place_shell", ("profile", "material", "asset_key", "solver"), None),
+    Stage("stern", "fill_stern", (), None),
+    Stage("stacking", "stack_layers", ("height",), None),
+    Stage("undercut", "generate_undercut", ("undercut",), None),
+    Stage("floor", "generate_floor", (), lambda gen: gen.do_floor),
+    Stage("armor", "apply_armor_thickness", ("thickness",), lambda gen: gen.thickness > 1),
+)
+
+StageSnapshot = namedtuple("StageSnapshot", ["guids", "rows", "volume", "solver_fallbacks", "stats"])
+
+
+class StageMemo:
+    """In-process LRU of stage outputs, keyed by BlueprintGenerator.stage_keys.
+
+    Keep one across exports (the GUI does) and a re-export only reruns the
+    stages downstream of the first changed input. Bounded by the bytes of
+    the stored rows and volume grids; the least recently used go first.
+    Thread-safe, so a background build can fill it while an export reads it.
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_MAX_BYTES // 2):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def nbytes(snapshot):
+        return snapshot.rows.nbytes + snapshot.volume.grid.nbytes
+
+    def get(self, key):
+        with self.lock:
+            snapshot = self.entries.get(key)
+            if snapshot is not None: self.entries.move_to_end(key)
+            return snapshot
+
+    def put(self, key, snapshot):
+        # Snapshots are never mutated once stored (restore copies), so they can be shared across threads
+        with self.lock:
+            if key in self.entries: self.size -= self.nbytes(self.entries.pop(key))
+            self.entries[key] = snapshot
+            self.size += self.nbytes(snapshot)
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, old = self.entries.popitem(last=False)
+                self.size -= self.nbytes(old)
+
+
+def placement_bounds(chunks):
+    # Min/max occupied cell over every block, including each block's length along z
+    lo = hi = None
+    for chunk in chunks:
+        length = chunk["len"].astype(np.int64) - 1
+        z = chunk["z"].astype(np.int64)
+        stern = (chunk["flags"] & FLAG_STERN) != 0
+        z_lo = np.where(stern, z - length, z)
+        z_hi = np.where(stern, z, z + length)
+        c_lo = np.array([chunk["x"].min(), chunk["y"].min(), z_lo.min()], dtype=np.int64)
+        c_hi = np.array([chunk["x"].max(), chunk["y"].max(), z_hi.max()], dtype=np.int64)
+        lo = c_lo if lo is None else np.minimum(lo, c_lo)
+        hi = c_hi if hi is None else np.maximum(hi, c_hi)
+    if lo is None: return None
+    return lo.tolist(), hi.tolist()
+
+
+def _stream_block_array(f, key, chunks, type_to_id):
+    f.write("[")
+    sep = ""
+    for chunk in chunks():
+        f.write(sep)
+        f.write(_render_block_array(key, chunk, type_to_id))
+        sep = ", "
+    f.write("]")
+
+
+def write_blueprint(out_file, placements, template, mirror_types=None, chunk_size=BLUEPRINT_CHUNK):
+    """Writes a blueprint from a DonorTemplate, streaming the block arrays.
+
+    The four per-block arrays are never built as Python lists: they are
+    rendered chunk by chunk straight into a buffered file, so peak memory
+    stays bounded by the chunk size rather than the block count. Port
+    twins of FLAG_MIRROR rows are generated on the fly (see mirror_rows).
+    """
+    guids = placements.guid_table.guids
+    if len(placements) <= chunk_size:
+        # One chunk anyway: expand the twins once for all six passes below
+        expanded = list(placements.iter_blocks(chunk_size, mirror_types))
+        chunks = lambda: expanded
+    else:
+        chunks = lambda: placements.iter_blocks(chunk_size, mirror_types)
+
+    # Item ids are handed out in order of first appearance
+    order = []
+    for chunk in chunks():
+        types, first_seen = np.unique(chunk["type"], return_index=True)
+        for t in types[np.argsort(first_seen)].tolist():
+            if t not in order: order.append(t)
+
+    type_to_id = np.zeros(max(len(guids), 1), dtype=np.int64)
+    item_dict = dict(template.item_dictionary)
+    for i, t in enumerate(order):
+        type_to_id[t] = FIRST_ITEM_ID + i
+        item_dict[str(FIRST_ITEM_ID + i)] = guids[t]
+
+    count = placements.block_count()
+    values = {
+        "ItemDictionary": json.dumps(item_dict),
+        "SavedTotalBlockCount": str(count),
+        "TotalBlockCount": str(count),
+        "AliveCount": str(count),
+        "BlockState": json.dumps(f"=0,{count}"),
+    }
+    bounds = placement_bounds(chunks())
+    if bounds:
+        values["MinCords"] = json.dumps(",".join(map(str, bounds[0])))
+        values["MaxCords"] = json.dumps(",".join(map(str, bounds[1])))
+    for key in BLOCK_ARRAYS:
+        values[key] = lambda f, key=key: _stream_block_array(f, key, chunks, type_to_id)
+
+    with open(out_file, "w", buffering=1 << 20) as f:
+        template.write(f, values)
+
+
+class TaskPool:
+    """Maps a picklable function over tasks, in worker processes when there are several of both.
+
+    Used as `with TaskPool(...) as results: for r in results: ...`. The pool
+    is closed and joined on the way out, or terminated first if the loop
+    raised (a cancel, Ctrl+C or a failing consumer).
+    """
+
+    def __init__(self, fn, tasks, workers, ordered=True, chunksize=1):
+        self.fn = fn
+        self.tasks = tasks
+        self.ordered = ordered
+        self.chunksize = chunksize
+        self.pool = None
+        if workers > 1 and len(tasks) > 1:
+            import multiprocessing # Deferred: only parallel runs need it
+            self.pool = multiprocessing.Pool(processes=min(workers, len(tasks)))
+
+    def __enter__(self):
+        if self.pool is None: return map(self.fn, self.tasks)
+        imap = self.pool.imap if self.ordered else self.pool.imap_unordered
+        return imap(self.fn, self.tasks, self.chunksize)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.pool is None: return
+        if exc_type is not None: self.pool.terminate()
+        self.pool.close()
+        self.pool.join()
+
+
+def _write_material_blueprint(task):
+    # Pool worker for generate_materials(): shared rows, one material's GUIDs
+    out_file, rows, layers, guids, mirror_types = task
+    placements = PlacementStore(GuidTable(guids), rows)
+    if layers > 1: placements = StackedPlacements(placements, layers)
+    write_blueprint(out_file, placements, load_donor_template(), mirror_types)
+    return out_file
+
+
+class BlueprintGenerator:
+    def __init__(self, profile, center_offset, height, undercut, do_floor, save_path, material, thickness,
+                 output_name=OUTPUT_FILENAME, headless=False, solver="greedy", progress=None, cancel_event=None,
+                 solver_cache=None, shell=None, armor_workers=1, trace_memory=False, result_cache=None,
+                 stage_memo=None):
+        self.profile = profile
+        self.center_offset = center_offset
+        self.height = height
+        self.undercut = undercut
+        self.do_floor = do_floor
+        self.save_path = save_path
+        self.material = material
+        self.thickness = thickness # <--- Armor Thickness
+        self.output_name = output_name
+        self.headless = headless # No console chatter (GUI exports, batch workers)
+        self.solver = solver # "greedy" (default) or "dp" (lowest fit penalty)
+        self.solver_fallbacks = 0
+        self.stage_stats = [] # One entry per stage run by generate(), see run_stage()
+        self.report = None # Last generate()'s stage report, also written next to the blueprint
+        self.trace_memory = trace_memory # tracemalloc peaks per stage; slows generation down several times
+        self.progress = progress # callback(stage, fraction) for UI progress
+        self.cancel_event = cancel_event # threading.Event; set it to abort generate()
+        self.solver_cache = solver_cache # dict kept across runs; enables incremental re-solves
+        self.shell = shell # Pre-solved (penalty, PlacementStore, fallbacks) for this profile, if any
+        self.armor_workers = armor_workers # Threads for apply_armor_thickness; >1 processes Y levels in parallel
+        self.result_cache = result_cache # ResultCache; generate() copies unchanged hulls from it
+        self.stage_memo = stage_memo # StageMemo; build_hull() resumes after the last unchanged stage
+        self.guid_table = GuidTable()
+        self.placements = PlacementStore(self.guid_table)
+        self.volume = HullVolume() # Cell ownership of self.placements, shared by every stage
+
+        # Initialize empty dictionaries (No hardcoding!)
+        self.beam_guids = {}
+        self.slope_guids = {}
+        self.offset_guids = {}
+        self.load_assets()
+
+
+    def load_assets(self):
+        assets = material_assets(self.material) # alloy, metal, wood, heavy, stone
+
+        # Private copies, so nothing can mutate the shared catalog
+        self.beam_guids = dict(assets["beam"])
+        self.slope_guids = dict(assets["slope"])
+        self.offset_guids = {l: dict(sides) for l, sides in assets["offset"].items()}
+
+        self.candidates = CandidateCatalog(self.beam_guids, self.slope_guids, self.guid_table)
+
+    @property
+    def asset_key(self):
+        # Every GUID this hull can place; part of the stage memo keys, so edited GUID maps never reuse a stage
+        return (sorted(self.beam_guids.items()), sorted(self.slope_guids.items()),
+                sorted((l, sorted(sides.items(), key=lambda kv: kv[0])) for l, sides in self.offset_guids.items()))
+
+    def report_error(self, message):
+        # The engine never shows dialogs; callers (GUI, batch) decide how to surface it
+        raise GeneratorError(message)
+
+    def log(self, message):
+        if not self.headless:
+            print(message)
+
+    def report_progress(self, stage, fraction=0.0):
+        # Doubles as the cancellation point between and inside stages
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise GenerationCancelled("Generation cancelled")
+        if self.progress:
+            self.progress(stage, fraction)
+
+    def run_stage(self, stage, fn):
+        """Runs one generate() stage, recording wall/CPU time, traced memory peak and block counts."""
+        self.report_progress(stage)
+        blocks_in = self.placements.block_count()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            mem_start = tracemalloc.get_traced_memory()[0]
+        wall, cpu = time.perf_counter(), time.process_time()
+
+        result = fn()
+
+        entry = {"stage": stage,
+                 "wall_s": round(time.perf_counter() - wall, 6),
+                 "cpu_s": round(time.process_time() - cpu, 6),
+                 # Allocated on top of what was live when the stage started
+                 "peak_bytes": tracemalloc.get_traced_memory()[1] - mem_start if tracemalloc.is_tracing() else None,
+                 "blocks_in": blocks_in,
+                 "blocks_out": self.placements.block_count()}
+        self.stage_stats.append(entry)
+        return result
+
+    def generate(self):
+        if 1 not in self.beam_guids:
+             self.report_error(f"Could not find 1m Block ID for '{self.material}' in JSON maps.")
+             return None
+
+        start = time.perf_counter()
+        # Memory tracing is a measurement, so it always runs the stages
+        key = self.cache_key() if self.result_cache is not None and not self.trace_memory else None
+        if key is not None:
+            out_file = self.output_file()
+            self.report = self.result_cache.fetch(key, out_file)
+            if self.report is not None:
+                self.report.update(blueprint=out_file, wall_s=round(time.perf_counter() - start, 6), cache="hit")
+                self.write_report(os.path.splitext(out_file)[0] + ".report.json")
+                return out_file
+
+        out_file = self.traced(self.run_stages)
+        self.report = self.stage_report(out_file, time.perf_counter() - start)
+        if out_file:
+            if key is not None:
+                self.report["cache"] = "miss"
+                try:
+                    self.result_cache.store(key, out_file, self.report)
+                except OSError as e:
+                    self.log(f"Could not cache result: {e}")
+            self.write_report(os.path.splitext(out_file)[0] + ".report.json")
+        return out_file
+
+    def cache_key(self):
+        """ResultCache key: outline, output-affecting settings, this material's assets and the donor."""
+        if not os.path.exists(DONOR_BLUEPRINT): return None
+        params = {"height": self.height, "undercut": self.undercut, "floor": bool(self.do_floor),
+                  "thickness": self.thickness, "material": self.material.lower(), "solver": self.solver}
+        return ResultCache.key(self.profile, params, material_assets(self.material), load_donor_template())
+
+    def generate_materials(self, materials, workers=1):
+        """Builds the hull once and writes one blueprint per material.
+
+        Materials offering the same block lengths as this generator's own
+        (see geometry_signature) get the same geometry, so their blueprints
+        only remap block types to their GUIDs; with workers > 1 those are
+        written in a process pool. A material with a different length set
+        falls back to a full generate() of its own. Blueprints are named
+        <stem>_<material>.blueprint after output_name; returns
+        {material: blueprint path}.
+        """
+        if 1 not in self.beam_guids:
+             self.report_error(f"Could not find 1m Block ID for '{self.material}' in JSON maps.")
+             return None
+
+        own = geometry_signature(material_assets(self.material))
+        shared = [m for m in materials if geometry_signature(material_assets(m)) == own]
+        separate = [m for m in materials if m not in shared]
+        stem = os.path.splitext(self.output_name)[0]
+        out_dir = self.save_path or BASE_DIR
+
+        def run():
+            self.build_hull()
+            return self.run_stage("save", lambda: self.save_materials(shared, out_dir, stem, workers))
+
+        start = time.perf_counter()
+        files = self.traced(run)
+        for material in separate:
+            self.log(f"{material} lacks some of {self.material}'s block lengths, solving it separately...")
+            gen = BlueprintGenerator(self.profile, self.center_offset, self.height, self.undercut, self.do_floor,
+                                     out_dir, material, self.thickness, f"{stem}_{material.lower()}.blueprint",
+                                     headless=self.headless, solver=self.solver, cancel_event=self.cancel_event,
+                                     armor_workers=self.armor_workers, trace_memory=self.trace_memory)
+            files[material] = gen.generate()
+
+        self.report = self.stage_report(None, time.perf_counter() - start)
+        self.report["materials"] = {m: {"blueprint": files[m], "shared_geometry": m in shared} for m in materials}
+        self.write_report(os.path.join(out_dir, stem + ".report.json"))
+        return files
+
+    def traced(self, fn):
+        # Runs a whole pipeline with fresh stage stats, tracing memory if asked to
+        self.stage_stats = []
+        self.report = None
+        own_trace = self.trace_memory and not tracemalloc.is_tracing()
+        if own_trace: tracemalloc.start()
+        try:
+            return fn()
+        finally:
+            if own_trace: tracemalloc.stop()
+
+    def write_report(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report, f, indent=2)
+
+    def run_stages(self):
+        self.build_hull()
+        return self.run_stage("save", self.save_to_blueprint)
+
+    def build_hull(self):
+        self.log("Starting Solver...")
+        self.placements = PlacementStore(self.guid_table) # Clear previous
+        self.volume = HullVolume()
+
+        stages = [st for st in PIPELINE if st.when is None or st.when(self)]
+        keys = self.stage_keys(stages)
+        resume = 0
+        if self.stage_memo is not None:
+            for i in reversed(range(len(stages))):
+                snapshot = self.stage_memo.get(keys[i])
+                if snapshot is not None:
+                    self.restore(snapshot)
+                    resume = i + 1
+                    break
+
+        for st, key in zip(stages[resume:], keys[resume:]):
+            self.run_stage(st.name, getattr(self, st.method))
+            if st.name == "solver": self.stage_stats[-1]["fallbacks"] = self.solver_fallbacks
+            # Lazy stacks are not memoized: rebuilding one from the stage above is free
+            if self.stage_memo is not None and isinstance(self.placements, PlacementStore):
+                self.stage_memo.put(key, self.snapshot())
+
+    def stage_keys(self, stages):
+        """Chained memo key per stage: the stage above's key plus this stage's own inputs."""
+        keys = []
+        key = RESULT_CACHE_VERSION
+        for st in stages:
+            values = []
+            for name in st.inputs:
+                value = getattr(self, name)
+                if name == "profile": value = hashlib.sha256(np.ascontiguousarray(value, dtype=np.int64)).hexdigest()
+                values.append(value)
+            key = hashlib.sha256(repr((key, st.name, values)).encode()).hexdigest()
+            keys.append(key)
+        return keys
+
+    def snapshot(self):
+        return StageSnapshot(list(self.guid_table.guids), self.placements.array.copy(), self.volume.copy(),
+                             self.solver_fallbacks, [dict(st) for st in self.stage_stats])
+
+    def restore(self, snapshot):
+        # Rows come back re-interned into this generator's GuidTable; cell owners are row indices, so they still hold
+        self.placements.extend(PlacementStore(GuidTable(snapshot.guids), snapshot.rows))
+        self.volume = snapshot.volume.copy()
+        self.solver_fallbacks = snapshot.solver_fallbacks
+        for st in snapshot.stats:
+            self.stage_stats.append(dict(st, wall_s=0.0, cpu_s=0.0, peak_bytes=None, memoized=True))
+
+    def place_shell(self):
+        if self.shell is not None:
+            score, result, self.solver_fallbacks = self.shell
+        else:
+            score, result = self.solve_shell(0, self.profile, is_inner_layer=False)
+
+        if len(result):
+            self.place(result)
+        else:
+            # Fallback
+            _, fb = self.solve_shell(1, self.profile, is_inner_layer=False)
+            self.place(fb)
+
+    def stage_report(self, out_file, total_s):
+        return {"blueprint": out_file,
+                "material": self.material, "solver": self.solver, "length": len(self.profile),
+                "height": self.height, "undercut": self.undercut, "floor": bool(self.do_floor),
+                "thickness": self.thickness,
+                "blocks": self.placements.block_count(),
+                "solver_fallbacks": self.solver_fallbacks,
+                "wall_s": round(total_s, 6),
+                "stages": self.stage_stats}
+
+    def place(self, rows):
+        """Appends placement rows (array or PlacementStore) and marks their cells in the volume."""
+        start = len(self.placements)
+        self.placements.extend(rows)
+        self.volume.mark(self.placements.array[start:], start)
+
+    def mirror_types(self):
+        """Block type of each type's port twin: offsets swap handedness, the rest are symmetric."""
+        pairs = [(self.guid_table.index(sides["left"]), self.guid_table.index(sides["right"]))
+                 for sides in self.offset_guids.values() if sides["left"] and sides["right"]]
+        mirror = np.arange(len(self.guid_table))
+        for left, right in pairs:
+            mirror[left], mirror[right] = right, left
+        return mirror
+
+    @staticmethod
+    def mirror_off_center(rows):
+        # Everything right of the centerline gets a port twin; x = 0 stays single
+        rows["flags"] |= np.where(rows["x"] > 0, FLAG_MIRROR, 0).astype(np.uint8)
+        return rows
+
+    def fill_stern(self):
+        if not self.profile.any(): return
+        stern_x_index = self.profile[-1]
+        dist_from_center = stern_x_index
+        z_pos = 0
+        end_x = (dist_from_center - 1)
+        guid_1m = self.beam_guids.get(1)
+        if not guid_1m: return
+        if end_x >= 0:
+            # Starboard half; the centerline block is the only one without a twin
+            xs = np.arange(0, end_x + 1)
+            beam_type = self.guid_table.index(guid_1m)
+            self.place(self.mirror_off_center(make_placements(xs, 10, z_pos, ROT_BEAM, beam_type, 1)))
+
+    def stack_layers(self):
+        if self.height <= 1: return
+        if self.undercut <= 0 and not self.do_floor and self.thickness <= 1:
+            # No later stage reads the volume or adds rows, so the decks stay
+            # lazy and are built layer by layer as the writer streams them out
+            self.placements = StackedPlacements(self.placements, self.height)
+            return
+        base_layer = self.placements.array
+        # Tile the base layer once per deck and drop each copy by its layer
+        # index; block types are indices into the shared GuidTable, so no
+        # per-block data is duplicated beyond the fixed-size rows.
+        stacked = np.tile(base_layer, self.height)
+        stacked["y"] -= np.repeat(np.arange(self.height, dtype=np.int16), len(base_layer))
+        self.placements = PlacementStore(self.guid_table, stacked)
+        # The first copy is the base layer itself, already in the volume
+        self.volume.mark(stacked[len(base_layer):], len(base_layer))
+
+    def generate_undercut(self):
+        if self.undercut <= 0: return
+
+        # Find the bottom-most blocks of the current layer
+        if not len(self.placements): return
+        min_y = self.placements.min_y()
+        parent_layer = self.placements.layer(min_y).array.copy()
+
+        max_z = int(parent_layer["z"].max()) if len(parent_layer) else 0
+        ship_center_z = max_z / 2
+
+        # Offset type per (length, side); -1 where the material lacks the pair,
+        # since only the starboard half is built and the port twin needs the other hand
+        max_len = max(self.offset_guids, default=0)
+        offset_types = np.full((max_len + 1, 2), -1, dtype=np.int64)
+        for length, sides in self.offset_guids.items():
+            if sides["left"] and sides["right"]:
+                offset_types[length] = self.guid_table.index(sides["left"]), self.guid_table.index(sides["right"])
+
+        for u in range(1, self.undercut + 1):
+            self.report_progress("undercut", (u - 1) / self.undercut)
+            current_undercut_y = min_y - u
+
+            # 1. Place Slopes/Offsets (The curved part of the undercut)
+            # Forward slopes take the opposite-handed offset, stern slopes the same-handed one.
+            rot = parent_layer["rot"]
+            is_left_rot = np.isin(rot, (ROT_LEFT_IN, ROT_LEFT_STERN, ROT_LEFT_OUT))
+            is_right_rot = np.isin(rot, (ROT_RIGHT_IN, ROT_RIGHT_STERN, ROT_RIGHT_OUT))
+            is_stern = (parent_layer["flags"] & FLAG_STERN) != 0
+            length = parent_layer["len"].astype(np.int64)
+            side = np.where(is_left_rot != is_stern, 1, 0) # 0 = "left", 1 = "right"
+            offset_type = np.where(length <= max_len, offset_types[np.minimum(length, max_len), side], -1)
+            has_offset = ((parent_layer["flags"] & FLAG_SLOPE) != 0) & (is_left_rot | is_right_rot) & (offset_type >= 0)
+
+            offsets = parent_layer[has_offset].copy()
+            offsets["y"] = current_undercut_y
+            offsets["z"] += np.where(is_stern[has_offset], 1, -1)
+            offsets["type"] = offset_type[has_offset]
+            self.place(offsets)
+
+            # 2. Fill Straight Sections (Beams)
+            # A. Propagate beams downwards (The vertical walls)
+            # Shift based on position relative to center to align nicely
+            walls = parent_layer[(parent_layer["flags"] & FLAG_SLOPE) == 0].copy()
+            walls["z"] += np.where(walls["z"] > ship_center_z, -1, 1).astype(np.int16)
+            walls["flags"] = 0
+            wall_x, _, wall_z = block_cells(walls)
+
+            # B. Fill horizontally from offsets (The transition)
+            # IMPORTANT CHANGE: We only fill 1 block inward to maintain shell thickness.
+            # The inner loop will handle the rest.
+            off_stern = (offsets["flags"] & FLAG_STERN) != 0
+            edge_x = offsets["x"].astype(np.int64)
+            edge_z = offsets["z"].astype(np.int64) + np.where(off_stern, 1, -1)
+
+            # Keep only cells the offsets left free; repeats are merged by the packer
+            raw_x = np.concatenate([wall_x, edge_x])
+            raw_z = np.concatenate([wall_z, edge_z])
+            free = ~self.volume.occupied(raw_x, current_undercut_y, raw_z)
+
+            optimized_beams = self.mirror_off_center(
+                self.optimize_beams(np.column_stack([raw_x[free], raw_z[free]]), current_undercut_y).array)
+            self.place(optimized_beams)
+
+            parent_layer = np.concatenate([offsets, optimized_beams])
+
+    def generate_floor(self):
+        if not len(self.placements): return
+
+        min_y = self.placements.min_y()
+        # Bottom-layer footprint as a (z, x) grid
+        occupied = (self.volume.layer(min_y) != 0).T
+        zs, xs = np.nonzero(occupied)
+        if not len(xs): return
+        x0, _, z0 = self.volume.origin
+        if x0 > 0:
+            # Nothing sits on the centerline, so the grid starts right of it
+            occupied = np.pad(occupied, ((0, 0), (x0, 0)))
+            xs, x0 = xs + x0, 0
+
+        # Per-z starboard wall in one pass; rows without blocks keep an empty span.
+        # The port wall is its mirror image, so the span starts at the centerline.
+        hi = np.full(len(occupied), -1, dtype=np.int64)
+        np.maximum.at(hi, zs, xs)
+
+        # Fill every empty cell from the centerline up to the wall, scanning z then x
+        cols = np.arange(occupied.shape[1])
+        interior = (cols + x0 >= 0) & (cols < hi[:, None]) & ~occupied
+        fz, fx = np.nonzero(interior)
+
+        floor_beams = self.optimize_beams(np.column_stack([fx + x0, fz + z0]), min_y)
+        self.place(self.mirror_off_center(floor_beams.array))
+
+    def optimize_beams(self, voxels, y_level):
+        """Packs 1m voxels into runs of 4/3/2/1m beams along z.
+
+        voxels is a sequence or (N, 2) array of (x, z); y_level is one y for
+        all of them or a per-voxel array, so several layers can be packed in
+        one call. Columns are emitted in order of first appearance of (y, x),
+        each column's runs by ascending z, largest beams first within a run.
+        """
+        vox = np.asarray(voxels, dtype=np.int64).reshape(-1, 2)
+        if not len(vox): return PlacementStore(self.guid_table)
+        x, z = vox[:, 0], vox[:, 1]
+        y = np.broadcast_to(np.asarray(y_level, dtype=np.int64), x.shape)
+
+        # Rank each (y, x) column by its first appearance, then sort by (column, z)
+        _, first, inverse = np.unique((y << 32) | (x & 0xFFFFFFFF), return_index=True, return_inverse=True)
+        rank = np.empty(len(first), dtype=np.int64)
+        rank[np.argsort(first)] = np.arange(len(first))
+        col = rank[inverse]
+        order = np.lexsort((z, col))
+        col, z = col[order], z[order]
+        keep = np.ones(len(z), dtype=bool)
+        keep[1:] = (col[1:] != col[:-1]) | (z[1:] != z[:-1])
+        col, z, order = col[keep], z[keep], order[keep]
+
+        # Runs of consecutive z within one column
+        starts = np.flatnonzero(np.r_[True, (col[1:] != col[:-1]) | (np.diff(z) != 1)])
+        run_len = np.diff(np.r_[starts, len(z)])
+
+        # Greedy largest-first split of every run at once; 1m is the fallback size
+        sizes = [size for size in (4, 3, 2) if size in self.beam_guids] + [1]
+        counts = np.empty((len(starts), len(sizes)), dtype=np.int64)
+        rem = run_len.copy()
+        for j, size in enumerate(sizes):
+            counts[:, j] = rem // size
+            rem -= counts[:, j] * size
+
+        used = counts.any(axis=0)
+        types = np.array([self.guid_table.index(self.beam_guids[size]) if used[j] else 0
+                          for j, size in enumerate(sizes)], dtype=np.int64)
+        per_run = counts.sum(axis=1)
+        run_of = np.repeat(np.arange(len(starts)), per_run)
+        block_len = np.repeat(np.tile(sizes, len(starts)), counts.ravel())
+        block_type = np.repeat(np.tile(types, len(starts)), counts.ravel())
+        offset = np.cumsum(block_len) - block_len
+        offset -= np.repeat(offset[np.cumsum(per_run) - per_run], per_run)
+
+        anchor = order[starts][run_of]
+        rows = make_placements(x[anchor], y[anchor], z[starts][run_of] + offset, ROT_BEAM, block_type, block_len)
+        return PlacementStore(self.guid_table, rows)
+
+    def simulate_hull(self, forced_1m_zone, target_profile, is_inner_layer=False):
+        target_profile = [int(v) for v in target_profile] # Plain ints: cheap scalar indexing
+        L = len(target_profile)
+        current_z = 0
+        current_min_len = 1
+        total_penalty = 0
+        fallbacks = 0
+        catalog = self.candidates
+        steps = []
+        checkpoints = [] # Solver state before each step: (z, min_len, penalty, fallbacks, steps taken)
+
+        state = self.solver_state("greedy", forced_1m_zone, is_inner_layer)
+        if state is not None and state["profile"] is not None:
+            if state["profile"] == target_profile:
+                total_penalty, steps, fallbacks = state["result"]
+                self.solver_fallbacks = fallbacks
+                return total_penalty, self.emit_shell(steps, target_profile)
+
+            # Resume from the last step whose reads all precede the first change
+            dirty = first_profile_change(state["profile"], target_profile)
+            checkpoints = state["checkpoints"]
+            keep = 0
+            while keep < len(checkpoints) and checkpoints[keep][0] + catalog.reach < dirty:
+                keep += 1
+            if keep:
+                current_z, current_min_len, total_penalty, fallbacks, n_steps = checkpoints[keep - 1]
+                checkpoints = checkpoints[:keep - 1]
+                steps = state["steps"][:n_steps]
+            else:
+                checkpoints = []
+
+        next_report = current_z
+
+        while current_z < L:
+            checkpoints.append((current_z, current_min_len, total_penalty, fallbacks, len(steps)))
+            if current_z >= next_report:
+                self.report_progress("solver", current_z / L)
+                next_report = current_z + 256
+            x_current = target_profile[current_z]
+            dist_current = x_current
+
+            best_choice = None
+            min_step_cost = float('inf')
+
+            candidates = catalog.select(is_inner_layer, current_z < forced_1m_zone)
+
+            for cand in candidates:
+                b_len = cand.len
+                if current_z + b_len > L: continue
+
+                target_x = target_profile[current_z + b_len - 1]
+                if current_z + b_len < L: target_x = target_profile[current_z + b_len]
+                else: target_x = target_profile[-1]
+
+                dist_ideal = dist_current - cand.offset
+                error = abs(target_x - dist_ideal)
+
+                # Relax error slightly for beams-only (staircasing)
+                threshold = 1.0
+                if is_inner_layer: threshold = 1.5
+
+                if error > threshold: continue
+
+                fit_penalty = error * 50
+                len_penalty = (current_min_len - b_len) * 10 if b_len < current_min_len else -(b_len * 2)
+                efficiency_cost = 10
+                total_step_cost = len_penalty + efficiency_cost + fit_penalty
+
+                valid_lookahead = True
+
+                # --- FIX: DISABLE LOOKAHEAD FOR INNER LAYERS ---
+                # We only check lookahead for the outer shell.
+                # Inner shells are allowed to be 'blocky' stairs.
+                if b_len > 1 and not is_inner_layer:
+                    lookahead_z = current_z + int(b_len * 1.5)
+                    if lookahead_z < L:
+                        future_x = target_profile[lookahead_z]
+                        ratio = (lookahead_z - current_z) / b_len
+                        dist_fut_ideal = dist_current - (cand.offset * ratio)
+                        if abs(future_x - dist_fut_ideal) > threshold: valid_lookahead = False
+                # -----------------------------------------------
+
+                if not valid_lookahead: continue
+
+                if total_step_cost < min_step_cost:
+                    min_step_cost = total_step_cost
+                    best_choice = cand
+
+            if not best_choice:
+                # A fallback step costs the flat 200 alone (min_step_cost is still inf)
+                total_penalty += 200
+                min_step_cost = 0
+                current_min_len = 1
+
+                best_err = float('inf')
+                for c in catalog.fallback_for(is_inner_layer):
+                    if current_z + c.len > L: continue
+                    tx = target_profile[current_z+1] if current_z+1 < L else target_profile[-1]
+                    di = dist_current - c.offset
+                    if abs(tx - di) < best_err: best_err = abs(tx - di); best_choice = c
+
+                fallbacks += 1
+                if not best_choice: current_z += 1; continue
+
+            total_penalty += min_step_cost
+            b_len = best_choice.len
+            current_min_len = b_len
+
+            steps.append((current_z, best_choice))
+            current_z += b_len
+
+        if state is not None:
+            state.update(profile=target_profile, checkpoints=checkpoints, steps=steps,
+                         result=(total_penalty, steps, fallbacks))
+
+        self.solver_fallbacks = fallbacks
+        return total_penalty, self.emit_shell(steps, target_profile)
+
+    def solver_state(self, solver, forced_1m_zone, is_inner_layer):
+        # Per-run checkpoints kept in self.solver_cache (if any) for incremental re-solves.
+        # Cached steps hold Candidates, whose guid_index is only meaningful against the
+        # candidate table they came from, so the table is part of the key: reloaded
+        # GUID maps that change any block start a fresh state.
+        if self.solver_cache is None: return None
+        key = (solver, self.material.lower(), forced_1m_zone, bool(is_inner_layer), self.candidates.table)
+        return self.solver_cache.setdefault(key, {"profile": None})
+
+    def solve_shell(self, forced_1m_zone, target_profile, is_inner_layer=False):
+        if self.solver == "greedy":
+            return self.simulate_hull(forced_1m_zone, target_profile, is_inner_layer)
+        return self.solve_hull_dp(forced_1m_zone, target_profile, is_inner_layer)
+
+    def fit_tables(self, candidates, forced_1m_zone, target_profile, is_inner_layer=False):
+        """Vectorized feasibility and fit penalty of every candidate at every z.
+
+        Returns a (candidates, L) float array holding the fit penalty, or inf
+        where the candidate misses the outline or fails the lookahead.
+        """
+        profile = np.asarray(target_profile, dtype=np.int64)
+        L = len(profile)
+        zs = np.arange(L)
+        threshold = 1.5 if is_inner_layer else 1.0
+
+        tables = np.full((len(candidates), L), np.inf)
+        for i, cand in enumerate(candidates):
+            b_len = cand.len
+            ends = zs + b_len
+            target_x = profile[np.minimum(ends, L - 1)]
+            target_x = np.where(ends < L, target_x, profile[-1])
+            error = np.abs(target_x - (profile - cand.offset))
+            ok = (ends <= L) & (error <= threshold)
+            if b_len > 1 and forced_1m_zone > 0:
+                ok &= zs >= forced_1m_zone
+
+            if b_len > 1 and not is_inner_layer:
+                step = int(b_len * 1.5)
+                look = zs + step
+                future_x = profile[np.minimum(look, L - 1)]
+                ratio = step / b_len
+                fut_err = np.abs(future_x - (profile - cand.offset * ratio))
+                ok &= (look >= L) | (fut_err <= threshold)
+
+            tables[i, ok] = error[ok] * 50.0
+        return tables
+
+    def solve_hull_dp(self, forced_1m_zone, target_profile, is_inner_layer=False):
+        # Exact shortest path over (z, previous segment length) states using the
+        # greedy solver's step cost: fit + length + efficiency, a 200 penalty for
+        # each forced 1m fallback step, and the same lookahead constraint. Among
+        # equally penalized paths it takes the one with the fewest blocks.
+        L = len(target_profile)
+        candidates = self.candidates.select(is_inner_layer, False)
+        fb_cands = self.candidates.fallback_for(is_inner_layer)
+        tables = self.fit_tables(candidates, forced_1m_zone, target_profile, is_inner_layer)
+        profile = [int(v) for v in target_profile]
+        max_len = max([c.len for c in candidates] + [1])
+        inf = float('inf')
+
+        # The step cost separates into len_penalty(prev, b) + fit(candidate), so
+        # only the best-fitting candidate of each length can be on the optimal
+        # path. Pick it per z up front (argmin keeps the first on ties).
+        per_length = []
+        picks_by_len = {}
+        for b_len in sorted({c.len for c in candidates}):
+            idx = [i for i, c in enumerate(candidates) if c.len == b_len]
+            sub = tables[idx]
+            pick = sub.argmin(axis=0)
+            fits = sub[pick, np.arange(L)].tolist()
+            picks_by_len[b_len] = [candidates[idx[k]] for k in pick.tolist()]
+            # Length penalty of a b_len segment after each previous length p
+            pen = [(p - b_len) * 10 if b_len < p else -(b_len * 2) for p in range(max_len + 1)]
+            per_length.append((b_len, fits, pen))
+        any_fit = np.isfinite(tables).any(axis=0).tolist() if len(candidates) else [False] * L
+
+        # Block count is the secondary objective (see DP_BLOCK_TIE)
+        step_cost = 10 + DP_BLOCK_TIE
+        fallback_cost = 200 + DP_BLOCK_TIE
+
+        # cost[z][p]: cheapest way to reach z with p as the last segment length.
+        # back[z][p] is the length before that; the step itself started at z - p,
+        # with the pick for its length there, or fallback[z - p] where nothing fit.
+        start_z = 0
+        state = self.solver_state("dp", forced_1m_zone, is_inner_layer)
+        if state is not None and state["profile"] is not None and state["max_len"] == max_len:
+            if state["profile"] == profile:
+                total_penalty, steps, fallbacks = state["result"]
+                self.solver_fallbacks = fallbacks
+                return total_penalty, self.emit_shell(steps, profile)
+
+            # Columns up to `resume` only received steps that read the unchanged
+            # prefix; keep them and replay the steps that can reach past them.
+            resume = min(first_profile_change(state["profile"], profile) - self.candidates.reach, L)
+            if resume > 0:
+                start_z = max(0, resume - max_len + 1)
+                cost = state["cost"][:resume + 1] + [[inf] * (max_len + 1) for _ in range(L - resume)]
+                back = state["back"][:resume + 1] + [[0] * (max_len + 1) for _ in range(L - resume)]
+                fallback = state["fallback"][:start_z] + [None] * (L - start_z)
+
+        if not start_z:
+            cost = [[inf] * (max_len + 1) for _ in range(L + 1)]
+            back = [[0] * (max_len + 1) for _ in range(L + 1)]
+            fallback = [None] * L
+            cost[0][1] = 0
+
+        for z in range(start_z, L):
+            if not z & 0xFF: self.report_progress("solver", z / L)
+            row = cost[z]
+            # Unreachable rows stay at inf and never relax anything
+            if any_fit[z]:
+                # Lengths come in ascending order, and after any p <= b_len the
+                # penalty is the same -2 * b_len, so a running minimum covers
+                # those; only the shorter-after-longer cases need a scan.
+                low = inf
+                low_p = 0
+                for b_len, fits, pen in per_length:
+                    if row[b_len] < low: low = row[b_len]; low_p = b_len
+                    fit = fits[z]
+                    if fit == inf: continue
+                    best = low - 2 * b_len
+                    best_p = low_p
+                    for p in range(b_len + 1, max_len + 1):
+                        v = row[p] + pen[p]
+                        if v < best: best = v; best_p = p
+                    total = best + step_cost + fit
+                    nxt = cost[z + b_len]
+                    if total < nxt[b_len]:
+                        nxt[b_len] = total
+                        back[z + b_len][b_len] = best_p
+            else:
+                # Nothing fits: same 1m fallback the greedy solver takes
+                fb_choice = None
+                best_err = inf
+                tx = profile[z + 1] if z + 1 < L else profile[-1]
+                for c in fb_cands:
+                    err = abs(tx - (profile[z] - c.offset))
+                    if err < best_err: best_err = err; fb_choice = c
+                fallback[z] = fb_choice
+                best_p = min(range(1, max_len + 1), key=lambda p: row[p])
+                total = row[best_p] + (fallback_cost if fb_choice else 200)
+                if total < cost[z + 1][1]:
+                    cost[z + 1][1] = total
+                    back[z + 1][1] = best_p
+
+        # Walk the cheapest path back from the stern
+        end_p = min(range(1, max_len + 1), key=lambda p: cost[L][p])
+        steps = []
+        fallbacks = 0
+        z, p = L, end_p
+        while z > 0 and cost[z][p] < inf:
+            pz = z - p
+            if any_fit[pz]:
+                steps.append((pz, picks_by_len[p][pz]))
+            else:
+                fallbacks += 1
+                if fallback[pz]: steps.append((pz, fallback[pz]))
+            z, p = pz, back[z][p]
+        steps.reverse()
+        total_penalty = cost[L][end_p] - DP_BLOCK_TIE * len(steps)
+
+        if state is not None:
+            state.update(profile=profile, cost=cost, back=back, fallback=fallback, max_len=max_len,
+                         result=(total_penalty, steps, fallbacks))
+
+        self.solver_fallbacks = fallbacks
+        return total_penalty, self.emit_shell(steps, profile)
+
+    def emit_shell(self, steps, target_profile):
+        """Turns solver steps [(z, candidate)] into outer-shell placements.
+
+        Each step emits the starboard (x >= 0) block of its left/right pair,
+        flagged FLAG_MIRROR. Anchors are measured from the stern (L - z), so
+        this runs after solving and is cheap to redo when an incremental
+        re-solve changes the hull length.
+        """
+        store = PlacementStore(self.guid_table)
+        n = len(steps)
+        if not n: return store
+
+        L = len(target_profile)
+        poses = self.candidates.poses
+        zs = np.fromiter((z for z, _ in steps), dtype=np.int64, count=n)
+        pose = np.array([poses[c] for _, c in steps], dtype=np.int64)
+        b_len, z_shift, dx, rot_left, rot_right, flags, block_type = pose.T
+        dist = np.asarray(target_profile, dtype=np.int64)[zs]
+
+        # The right block sits at +(dist + dx); where that is negative the left one is starboard
+        x = dist + dx
+        rows = np.empty(n, dtype=PLACEMENT_DTYPE)
+        rows["x"] = np.abs(x)
+        rows["y"] = 10
+        rows["z"] = L - (zs + z_shift)
+        rows["rot"] = np.where(x < 0, rot_left, rot_right)
+        rows["type"] = block_type
+        rows["len"] = b_len
+        rows["flags"] = flags | FLAG_MIRROR
+        store.extend(rows)
+        return store
+
+    def save_to_blueprint(self):
+        if not os.path.exists(DONOR_BLUEPRINT):
+            self.report_error(f"Missing {DONOR_BLUEPRINT}")
+            return None
+        template = load_donor_template()
+
+        out_file = self.output_file()
+        write_blueprint(out_file, self.placements, template, self.mirror_types())
+        return out_file
+
+    def output_file(self):
+        # --- OUTPUT LOGIC ---
+        if self.save_path:
+            return os.path.join(self.save_path, self.output_name)
+        # Fallback to script directory if no path selected
+        return os.path.join(BASE_DIR, self.output_name)
+
+    def material_guids(self, assets):
+        """This hull's block types re-pointed at another material's blocks of the same shape and length."""
+        remap = {}
+        for l, guid in self.beam_guids.items(): remap[guid] = assets["beam"][l]
+        for l, guid in self.slope_guids.items(): remap[guid] = assets["slope"][l]
+        for l, sides in self.offset_guids.items():
+            for side, guid in sides.items():
+                if guid and assets["offset"].get(l, {}).get(side): remap[guid] = assets["offset"][l][side]
+        return [remap[guid] for guid in self.guid_table.guids]
+
+    def block_summary(self):
+        """({block label: count}, total block metres) over the finished ship, port twins included."""
+        labels = {}
+        for l, guid in self.beam_guids.items(): labels[guid] = f"beam {l}m"
+        for l, guid in self.slope_guids.items(): labels[guid] = f"slope {l}m"
+        for l, sides in self.offset_guids.items():
+            for side, guid in sides.items():
+                if guid: labels[guid] = f"offset {l}m {side}"
+
+        mirror = self.mirror_types() # May intern offset types, so before sizing the counts
+        counts = np.zeros(len(self.guid_table), dtype=np.int64)
+        metres = 0
+        for chunk in self.placements.iter_blocks(BLUEPRINT_CHUNK, mirror):
+            counts += np.bincount(chunk["type"], minlength=len(counts))
+            metres += int(chunk["len"].sum())
+        types = {labels.get(guid, guid): int(n) for guid, n in zip(self.guid_table.guids, counts.tolist()) if n}
+        return types, metres
+
+    def outline_deviation(self):
+        """Fidelity of the built hull: mean gap (m) between each deck's starboard wall and the outline.
+
+        Measured over every deck and every metre of the profile; a metre with
+        no wall counts its full outline width. Undercut decks taper away from
+        the outline, so this grows with undercut relative to height. A lazy
+        stack's decks are copies of the one in the volume, so that deck stands
+        for all of them.
+        """
+        profile = np.asarray(self.profile, dtype=np.int64)
+        grid = self.volume.grid != 0
+        if not grid.size or not len(profile): return None
+        x0, _, z0 = self.volume.origin
+        grid = grid[:, grid.any(axis=(0, 2)), :] # (x, deck, z), decks holding blocks only
+
+        # Profile index i sits at world z = L - i
+        local_z = len(profile) - np.arange(len(profile)) - z0
+        inside = (local_z >= 0) & (local_z < grid.shape[2])
+        cols = grid[:, :, local_z[inside]]
+        wall = x0 + grid.shape[0] - 1 - np.argmax(cols[::-1], axis=0) # Outermost x per (deck, z)
+        gaps = np.where(cols.any(axis=0), np.abs(wall - profile[inside]), profile[inside])
+        missing = int(profile[~inside].sum()) * grid.shape[1]
+        return float((gaps.sum() + missing) / (grid.shape[1] * len(profile)))
+
+    def save_materials(self, materials, out_dir, stem, workers=1):
+        if not os.path.exists(DONOR_BLUEPRINT):
+            self.report_error(f"Missing {DONOR_BLUEPRINT}")
+            return None
+
+        # Type indices (and so mirror_types) carry over; only the GUID behind each index changes
+        mirror = self.mirror_types()
+        # A lazy stack ships as its base layer; each worker extrudes it again while writing
+        lazy = isinstance(self.placements, StackedPlacements)
+        rows = self.placements.base.array if lazy else self.placements.array
+        layers = self.placements.height if lazy else 1
+        tasks = [(os.path.join(out_dir, f"{stem}_{m.lower()}.blueprint"), rows, layers,
+                  self.material_guids(material_assets(m)), mirror) for m in materials]
+
+        files = {}
+        with TaskPool(_write_material_blueprint, tasks, workers) as finished:
+            for i, (material, out_file) in enumerate(zip(materials, finished)):
+                files[material] = out_file
+                self.report_progress("save", (i + 1) / len(tasks))
+        return files
+
+
+    def apply_armor_thickness(self):
+        self.log(f"Applying {self.thickness}m armor thickness...")
+        # 1. Snapshot the occupancy so worker threads never see armor being marked
+        grid = self.volume.grid != 0
+        if not grid.any(): return
+        x0, y0, z0 = self.volume.origin
+
+        x_axis = np.arange(grid.shape[0]) + x0
+        band = self.thickness - 1
+
+        def fill_layer(level):
+            occupied = grid[:, level, :].T # (z, x)
+            # 2. Inward band of (thickness - 1) behind the starboard wall of every z row.
+            # It stays at x > 0, so the centerline is never filled; the port band is its mirror.
+            has_wall = occupied.any(axis=1)[:, None]
+            max_x = x_axis[-1 - np.argmax(occupied[:, ::-1], axis=1)][:, None]
+            starboard = (x_axis < max_x) & (x_axis >= max_x - band) & (x_axis > 0)
+            fz, fx = np.nonzero(starboard & ~occupied & has_wall)
+            # 3. Optimize these 1m voxels into beams for this Y level
+            return self.mirror_off_center(self.optimize_beams(np.column_stack([x_axis[fx], fz + z0]), level + y0).array)
+
+        # Intern the beam types up front so worker threads only read the GuidTable
+        for guid in self.beam_guids.values(): self.guid_table.index(guid)
+
+        levels = [y - y0 for y in self.volume.levels()]
+        from concurrent.futures import ThreadPoolExecutor # Deferred: only armor threading needs it
+        pool = ThreadPoolExecutor(self.armor_workers) if self.armor_workers > 1 and len(levels) > 1 else None
+        try:
+            filled = pool.map(fill_layer, levels) if pool else map(fill_layer, levels)
+            for i, rows in enumerate(filled):
+                self.report_progress("armor", i / len(levels))
+                # 4. Add new blocks to main list, in Y order whichever thread finished first
+                self.place(rows)
+        finally:
+            if pool: pool.shutdown(cancel_futures=True)
+
+# --- BATCH MODE ---
+# Manifest format (JSON):
+# {
+#   "output_dir": "fleet",                       (optional, relative to the manifest)
+#   "defaults": {"height": 3, "undercut": 5, "floor": true, "material": "Alloy", "thickness": 2, "solver": "greedy"},
+#   "hulls": [
+#     {"name": "frigate", "points": [[0, 0], [4, 2], [14, 4], [100, 3]], "height": 4},
+#     {"name": "barge", "profile": [0, 1, 2, 3, 3, 3], "output": "barge_v2.blueprint"}
+#   ]
+# }
+# Each hull takes either drawn outline "points" (z, x) or an already interpolated "profile".
+
+BATCH_DEFAULTS = {"height": 3, "undercut": 5, "floor": True, "material": "Alloy", "thickness": 2, "solver": "greedy"}
+
+
+def load_manifest(path):
+    with open(path, "r") as f:
+        manifest = json.load(f)
+
+    defaults = dict(BATCH_DEFAULTS)
+    defaults.update(manifest.get("defaults", {}))
+
+    output_dir = manifest.get("output_dir", "")
+    if output_dir and not os.path.isabs(output_dir):
+        output_dir = os.path.join(os.path.dirname(os.path.abspath(path)), output_dir)
+
+    jobs = []
+    for i, hull in enumerate(manifest.get("hulls", [])):
+        job = dict(defaults)
+        job.update(hull)
+        job.setdefault("name", f"hull_{i:04d}")
+        job.setdefault("output", f"{job['name']}.blueprint")
+        if "profile" not in job and "points" not in job:
+            raise ValueError(f"Hull '{job['name']}' needs 'points' or 'profile'")
+        if not len(job.get("profile", job.get("points", []))):
+            raise ValueError(f"Hull '{job['name']}' has an empty '{'profile' if 'profile' in job else 'points'}'")
+        jobs.append(job)
+    return jobs, output_dir
+
+
+def run_batch_job(job, output_dir):
+    """Generate one manifest entry. Runs inside a pool worker, so it never raises."""
+    start = time.perf_counter()
+    try:
+        if "profile" in job:
+            profile = np.asarray(job["profile"], dtype=int)
+        else:
+            profile = build_profile([tuple(p) for p in job["points"]])
+
+        generator = BlueprintGenerator(profile, 0, int(job["height"]), int(job["undercut"]), bool(job["floor"]),
+                                       output_dir, job["material"], int(job["thickness"]),
+                                       output_name=job["output"], headless=True, solver=job["solver"],
+                                       trace_memory=bool(job.get("trace_memory", False)),
+                                       result_cache=ResultCache(job["cache_dir"]) if job.get("cache_dir") else None)
+        out_file = generator.generate()
+        return {"name": job["name"], "file": out_file, "blocks": generator.report["blocks"],
+                "cached": generator.report.get("cache") == "hit",
+                "seconds": time.perf_counter() - start, "error": None}
+    except Exception as e:
+        return {"name": job["name"], "file": None, "blocks": 0, "cached": False,
+                "seconds": time.perf_counter() - start, "error": f"{type(e).__name__}: {e}"}
+
+
+def _run_batch_job_star(args):
+    return run_batch_job(*args)
+
+
+def run_batch(jobs, output_dir, workers=None):
+    workers = workers or os.cpu_count() or 1
+    if output_dir: os.makedirs(output_dir, exist_ok=True)
+
+    results = []
+    start = time.perf_counter()
+    tasks = [(job, output_dir) for job in jobs]
+    # Small chunks keep long and short hulls balanced across cores
+    chunksize = max(1, len(tasks) // (workers * 8))
+    with TaskPool(_run_batch_job_star, tasks, workers, ordered=False, chunksize=chunksize) as finished:
+        for result in finished:
+            results.append(result)
+            if result["error"]:
+                print(f"[FAIL] {result['name']}: {result['error']}")
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+# --- SWEEP MODE ---
+def parse_sweep_values(text, cast=int):
+    """Sweep axis values from "2-6", "2-10:2" (step) or "1,3,5"; items may mix both forms."""
+    values = []
+    for item in str(text).split(","):
+        item = item.strip()
+        if not item: continue
+        if cast is int and "-" in item.lstrip("-"):
+            span, _, step = item.partition(":")
+            lo, hi = span.split("-", 1)
+            values.extend(range(int(lo), int(hi) + 1, int(step or 1)))
+        else:
+            values.append(cast(item))
+    return list(dict.fromkeys(values))
+
+
+def sweep_cases(heights, undercuts, thicknesses, materials):
+    return [{"height": h, "undercut": u, "thickness": t, "material": m}
+            for m, h, u, t in itertools.product(materials, heights, undercuts, thicknesses)]
+
+
+def sweep_case_name(case):
+    return f"h{case['height']}_u{case['undercut']}_t{case['thickness']}_{case['material'].lower()}"
+
+
+def run_sweep_case(profile, case, do_floor, solver, shell):
+    """Builds one sweep combination without saving it. Runs inside a pool worker, so it never raises."""
+    start = time.perf_counter()
+    row = dict(case, name=sweep_case_name(case))
+    try:
+        generator = BlueprintGenerator(profile, 0, case["height"], case["undercut"], do_floor, "", case["material"],
+                                       case["thickness"], headless=True, solver=solver, shell=shell)
+        if 1 not in generator.beam_guids:
+            generator.report_error(f"Could not find 1m Block ID for '{case['material']}' in JSON maps.")
+        generator.traced(generator.build_hull)
+        types, metres = generator.block_summary()
+        row.update(blocks=generator.placements.block_count(), types=types,
+                   penalty=shell[0] if shell else None, deviation=generator.outline_deviation(),
+                   fallbacks=generator.solver_fallbacks, cost=metres * MATERIAL_COST.get(case["material"], 1),
+                   error=None)
+    except Exception as e:
+        row.update(blocks=0, types={}, penalty=None, deviation=None, fallbacks=0, cost=None,
+                   error=f"{type(e).__name__}: {e}")
+    row["seconds"] = time.perf_counter() - start
+    return row
+
+
+def _run_sweep_case_star(args):
+    return run_sweep_case(*args)
+
+
+def sweep_shells(profile, materials, solver):
+    """{material: shell tuple for BlueprintGenerator(shell=...)}, one solve per geometry_signature.
+
+    Height, undercut and thickness only change the stages after the solver,
+    and materials with the same block lengths get the same layout, so each
+    solved shell is re-pointed at the other materials' GUIDs (material_guids).
+    """
+    solved = {}
+    shells = {}
+    for material in materials:
+        sig = geometry_signature(material_assets(material))
+        if sig not in solved:
+            gen = BlueprintGenerator(profile, 0, 1, 0, False, "", material, 1, headless=True, solver=solver)
+            shell = None
+            if 1 in gen.beam_guids:
+                penalty, rows = gen.solve_shell(0, profile)
+                shell = (penalty, rows, gen.solver_fallbacks)
+            solved[sig] = (gen, shell)
+        gen, shell = solved[sig]
+        if shell is not None:
+            guids = GuidTable(gen.material_guids(material_assets(material)))
+            shell = (shell[0], PlacementStore(guids, shell[1].array), shell[2])
+        shells[material] = shell
+    return shells
+
+
+def mark_pareto(rows):
+    """Flags rows no other row beats on both block count and fidelity (outline_deviation)."""
+    ok = [r for r in rows if not r["error"]]
+    for r in rows:
+        r["pareto"] = not r["error"] and not any(
+            o["blocks"] <= r["blocks"] and o["deviation"] <= r["deviation"]
+            and (o["blocks"] < r["blocks"] or o["deviation"] < r["deviation"]) for o in ok)
+    return rows
+
+
+def run_sweep(profile, cases, do_floor=True, solver="greedy", workers=None, progress=None, cancel_event=None):
+    """Builds every case (see sweep_cases) without writing blueprints.
+
+    Returns one summary row per case, in case order: the case settings plus
+    blocks, per-type counts, solver penalty, outline deviation, fallbacks,
+    estimated cost (MATERIAL_COST), seconds and a Pareto flag. progress(done, total) is
+    called as cases finish; setting cancel_event raises GenerationCancelled.
+    """
+    workers = workers or os.cpu_count() or 1
+    shells = sweep_shells(profile, list(dict.fromkeys(c["material"] for c in cases)), solver)
+    tasks = [(profile, case, do_floor, solver, shells[case["material"]]) for case in cases]
+    rows = []
+    with TaskPool(_run_sweep_case_star, tasks, workers, chunksize=max(1, len(tasks) // (workers * 8))) as finished:
+        for row in finished:
+            rows.append(row)
+            if cancel_event is not None and cancel_event.is_set():
+                raise GenerationCancelled("Sweep cancelled")
+            if progress: progress(len(rows), len(tasks))
+    return mark_pareto(rows)
+
+
+SWEEP_COLUMNS = ("name", "material", "height", "undercut", "thickness", "blocks", "penalty", "deviation",
+                 "fallbacks", "cost", "seconds", "pareto", "error")
+
+
+def write_sweep_table(rows, path):
+    """Writes run_sweep() rows as CSV, one column per block type after the summary columns."""
+    types = sorted({t for r in rows for t in r["types"]})
+    import csv # Deferred: only sweep tables need it
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(SWEEP_COLUMNS + tuple(types))
+        for r in rows:
+            writer.writerow([round(r[c], 4) if c in ("seconds", "deviation") and r[c] is not None else r[c]
+                             for c in SWEEP_COLUMNS]
+                            + [r["types"].get(t, 0) for t in types])
+
+
+def sweep_jobs(profile, rows, do_floor=True, solver="greedy", stem="generated_hull"):
+    """Batch jobs (for run_batch) that write blueprints for picked sweep rows."""
+    return [dict(name=r["name"], output=f"{stem}_{r['name']}.blueprint", profile=np.asarray(profile).tolist(),
+                 height=r["height"], undercut=r["undercut"], thickness=r["thickness"], material=r["material"],
+                 floor=do_floor, solver=solver) for r in rows]
+
+
+def batch_main(argv):
+    import argparse # Deferred: only the command line needs it
+    parser = argparse.ArgumentParser(description="Generate hull blueprints from a manifest without the GUI.")
+    parser.add_argument("manifest", help="JSON manifest listing the hulls to generate")
+    parser.add_argument("-o", "--output-dir", help="Output folder (overrides the manifest)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument("--trace-memory", action="store_true", help="Record per-stage memory peaks in the reports (slow)")
+    parser.add_argument("--cache-dir", default=RESULT_CACHE_DIR, help="Result cache folder (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="Always regenerate; do not read or fill the cache")
+    args = parser.parse_args(argv)
+
+    jobs, output_dir = load_manifest(args.manifest)
+    for job in jobs:
+        job["trace_memory"] = args.trace_memory
+        job["cache_dir"] = None if args.no_cache else args.cache_dir
+    if args.output_dir: output_dir = args.output_dir
+    if not output_dir: output_dir = BASE_DIR
+
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Generating {len(jobs)} hulls on {workers} worker(s)...")
+    results, elapsed = run_batch(jobs, output_dir, workers)
+
+    ok = [r for r in results if not r["error"]]
+    failed = [r for r in results if r["error"]]
+    total_blocks = sum(r["blocks"] for r in ok)
+    elapsed = max(elapsed, 1e-9)
+    cached = sum(r["cached"] for r in ok)
+    print(f"Done: {len(ok)} ok ({cached} from cache), {len(failed)} failed in {elapsed:.2f}s")
+    print(f"Throughput: {len(ok) / elapsed:.2f} hulls/sec, {total_blocks / elapsed:.0f} blocks/sec")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(batch_main(sys.argv[1:]))